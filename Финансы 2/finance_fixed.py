@@ -32,14 +32,19 @@ class User:
     def __init__(self, username):
         self.username = username
         self.transactions = []
+        # Итоги обновляются при добавлении, чтобы не пересчитывать всю историю
+        self.income = 0.0
+        self.expense = 0.0
     
     def add_transaction(self, transaction):
         self.transactions.append(transaction)
+        if transaction.category.type == 'income':
+            self.income += transaction.amount
+        else:
+            self.expense += transaction.amount
     
     def get_balance(self):
-        income = sum(t.amount for t in self.transactions if t.category.type == 'income')
-        expense = sum(t.amount for t in self.transactions if t.category.type == 'expense')
-        return income - expense
+        return self.income - self.expense
 
 # Менеджер данных
 class DataManager:
@@ -110,7 +115,7 @@ class DataManager:
                     category=category,
                     description=t_data.get("description", "")
                 )
-                user.transactions.append(transaction)
+                user.add_transaction(transaction)
         
         return user
 
@@ -334,8 +339,8 @@ class FinanceApp:
         self.report_text.delete(1.0, tk.END)
         
         balance = self.current_user.get_balance()
-        income = sum(t.amount for t in self.current_user.transactions if t.category.type == 'income')
-        expense = sum(t.amount for t in self.current_user.transactions if t.category.type == 'expense')
+        income = self.current_user.income
+        expense = self.current_user.expense
         
         report = f"""📊 ФИНАНСОВЫЙ ОТЧЕТ
 
@@ -0,0 +1,201 @@
+"""Бенчмарки загрузки, сохранения, аналитики и графиков на синтетических данных.
+
+Запуск из папки finance_app:
+    python benchmarks/run_benchmarks.py --sizes 1000,10000,100000 --output results.json
+    python benchmarks/run_benchmarks.py --baseline results.json --threshold 1.25
+
+Для каждой операции и размера истории печатается время (медиана повторов)
+и пиковая память по tracemalloc, результаты сохраняются в JSON. С --baseline
+замеры сравниваются с прошлым файлом, и при замедлении больше порога код возврата 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import generate_user_data
+from services.data_manager import DataManager
+from services.storage import open_storage
+from services.analytics import AnalyticsService
+from ui.charts import SpendingPieChart, IncomeExpenseChart, TrendChart
+
+USERNAME = "bench"
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+# Разница меньше этой считается шумом, даже если отношение выше порога
+MIN_REGRESSION_SECONDS = 0.005
+
+def benchmarks(data_manager, user_data):
+    """Операции: имя -> (подготовка, замер). Подготовка не входит во время замера"""
+    def loaded_user():
+        data_manager.invalidate()
+        return data_manager.load_user(USERNAME)
+    
+    def warm_analytics():
+        user = loaded_user()
+        user.get_transactions_dataframe()
+        return AnalyticsService(user, data_manager)
+    
+    def cached_analytics():
+        service = warm_analytics()
+        service.compute_report("month")
+        return service
+    
+    def pie_data():
+        return warm_analytics().get_spending_by_category("all")
+    
+    def income_data():
+        return warm_analytics().get_income_vs_expense()
+    
+    def trend_data():
+        return warm_analytics().get_trends(datetime(2024, 12, 31))
+    
+    def updated_pie():
+        chart = SpendingPieChart()
+        chart.update(pie_data(), "all")
+        return chart
+    
+    def backdated_rows():
+        # 1% истории задним числом, как при импорте выписки: строки вливаются в индекс времени
+        store = data_manager.user_from_data(user_data).store
+        rows = np.random.default_rng(0).choice(len(store), max(1, len(store) // 100))
+        return store, (store.amounts[rows], store.timestamps[rows], store.category_codes[rows], [""] * len(rows))
+    
+    def last_week(user):
+        end = datetime(2025, 1, 1)
+        return user.query(start=end - timedelta(days=7), end=end)
+    
+    return {
+        "storage.save_user": (loaded_user, data_manager.save_user),
+        "storage.load_user": (lambda: data_manager.invalidate(), lambda _: data_manager.load_user(USERNAME)),
+        "user.dataframe": (lambda: data_manager.user_from_data(user_data),
+                           lambda user: user.get_transactions_dataframe()),
+        "store.backdated_import": (backdated_rows, lambda args: args[0].extend_columns(*args[1])),
+        "query.window_week": (loaded_user, last_week),
+        "analytics.spending_month": (warm_analytics, lambda service: service.get_spending_by_category("month")),
+        "analytics.spending_all": (warm_analytics, lambda service: service.get_spending_by_category("all")),
+        "analytics.income_vs_expense": (warm_analytics, lambda service: service.get_income_vs_expense()),
+        "analytics.trends": (warm_analytics, lambda service: service.get_trends(datetime(2024, 12, 31))),
+        "chart.trend.create": (trend_data, lambda data: TrendChart().update(data)),
+        "analytics.tips": (warm_analytics, lambda service: service.generate_economy_tips()),
+        "analytics.report_cached": (cached_analytics, lambda service: service.compute_report("month")),
+        "chart.pie.create": (pie_data, lambda data: SpendingPieChart().update(data, "all")),
+        "chart.pie.update": (updated_pie, lambda chart: chart.update(pie_data_scaled(chart), "all")),
+        "chart.bar.create": (income_data, lambda data: IncomeExpenseChart().update(data)),
+    }
+
+def pie_data_scaled(chart):
+    # Те же категории с другими долями - путь обновления на месте
+    return pd.Series({label: 1.0 + i for i, label in enumerate(chart.labels)})
+
+def measure(setup, run, repeat: int):
+    """Медиана времени по repeat запускам и пик памяти отдельного запуска под tracemalloc"""
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        run(arg)
+        times.append(time.perf_counter() - start)
+    
+    # tracemalloc замедляет код, поэтому память меряется отдельным запуском
+    arg = setup()
+    tracemalloc.start()
+    try:
+        run(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(times), peak / 2**20
+
+def run_size(size: int, backend: str, repeat: int, only=None) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        # Хранилища создают файлы в текущей папке - уводим их во временную
+        os.chdir(tmp)
+        try:
+            user_data = generate_user_data(USERNAME, size)
+            data_manager = DataManager(open_storage(backend))
+            data_manager.storage.save_user_data(user_data)
+            for name, (setup, run) in benchmarks(data_manager, user_data).items():
+                if only and not any(part in name for part in only):
+                    continue
+                seconds, peak_mb = measure(setup, run, repeat)
+                results.append({"op": name, "size": size, "seconds": seconds, "peak_mb": peak_mb})
+                print(f"{name:30} {size:>10}  {seconds * 1000:10.2f} мс  {peak_mb:9.1f} МБ")
+            close = getattr(data_manager.storage, "close", None)
+            if close:
+                close()
+        finally:
+            os.chdir(cwd)
+    return results
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    """Замедления относительно базового файла: [(операция, размер, было, стало)]"""
+    before = {(r["op"], r["size"]): r["seconds"] for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = before.get((r["op"], r["size"]))
+        if old is None:
+            continue
+        if r["seconds"] > old * threshold and r["seconds"] - old > MIN_REGRESSION_SECONDS:
+            regressions.append((r["op"], r["size"], old, r["seconds"]))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки на синтетических данных")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="размеры истории через запятую (до 10000000)")
+    parser.add_argument("--backend", default="json", choices=["json", "sqlite", "sharded"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", default=None, help="подстроки имен операций через запятую")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="файл прошлого запуска для сравнения")
+    parser.add_argument("--threshold", type=float, default=1.25, help="допустимое отношение время/база")
+    args = parser.parse_args(argv)
+    
+    only = args.only.split(",") if args.only else None
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        results.extend(run_size(size, args.backend, args.repeat, only))
+    
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "backend": args.backend,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "matplotlib": matplotlib.__version__
+        },
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for op, size, old, new in regressions:
+            print(f"Замедление: {op} [{size}] {old * 1000:.2f} -> {new * 1000:.2f} мс ({new / old:.2f}x)")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""Замер холодного старта до экрана входа по выводу python -X importtime.
+
+Запуск из папки finance_app:
+    python benchmarks/startup_imports.py --runs 5 --max-ms 400
+
+Код возврата 1, если старт медленнее порога или при старте загрузился
+тяжелый модуль из FORBIDDEN (pandas, matplotlib должны грузиться только после входа).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# То, что импортирует приложение до показа экрана входа и вкладки добавления
+STARTUP_IMPORTS = "import main, ui.login_window, ui.transaction_frame"
+
+# Модули, которые не должны попадать в холодный старт
+FORBIDDEN = ("pandas", "matplotlib", "ui.reports_frame", "services.analytics", "services.importer")
+
+def measure_once(statement: str = STARTUP_IMPORTS):
+    """Один запуск интерпретатора; возвращает (суммарное время импортов в мс, {модуль: мс})"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=APP_DIR, capture_output=True, text=True, check=True
+    )
+    modules = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        # Формат строки: "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.rstrip()
+        # Верхний уровень вложенности - без отступа в имени
+        if not name.startswith("  "):
+            total_us += int(cumulative_us)
+        modules[name.strip()] = int(cumulative_us) / 1000
+    return total_us / 1000, modules
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Время импорта при старте приложения")
+    parser.add_argument("--runs", type=int, default=5, help="число запусков, берется медиана")
+    parser.add_argument("--max-ms", type=float, default=None, help="порог медианы в мс")
+    parser.add_argument("--top", type=int, default=10, help="сколько самых долгих модулей показать")
+    args = parser.parse_args(argv)
+    
+    totals = []
+    modules = {}
+    for _ in range(args.runs):
+        total, modules = measure_once()
+        totals.append(total)
+    median = statistics.median(totals)
+    
+    print(f"Импорт при старте: медиана {median:.1f} мс, мин {min(totals):.1f}, макс {max(totals):.1f}")
+    for name, ms in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {ms:8.1f} мс  {name}")
+    
+    failed = False
+    loaded = [name for name in FORBIDDEN if name in modules]
+    if loaded:
+        print(f"Ошибка: при старте загружены тяжелые модули: {', '.join(loaded)}")
+        failed = True
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"Ошибка: старт {median:.1f} мс медленнее порога {args.max_ms:.1f} мс")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""Детерминированный генератор пользователей с историей нужного размера.
+
+Данные в формате хранилища (словарь как в finance_data.json): одинаковые
+size и seed всегда дают одинаковую историю, поэтому замеры сравнимы между запусками.
+"""
+import numpy as np
+from models.category import CategoryManager
+
+# Доля доходов среди транзакций
+INCOME_SHARE = 0.08
+# История растягивается на столько дней назад от START
+HISTORY_DAYS = 3 * 365
+START = np.datetime64("2022-01-01T00:00:00", "us")
+DESCRIPTIONS = np.array(["", "", "", "магазин у дома", "кофе", "такси", "аптека", "кино", "аренда"], dtype=object)
+
+def generate_user_data(username: str, size: int, seed: int = 0) -> dict:
+    """Пользователь с size транзакциями по категориям CategoryManager, даты по возрастанию"""
+    rng = np.random.default_rng(seed)
+    manager = CategoryManager()
+    incomes = manager.income_categories
+    expenses = manager.expense_categories
+    
+    is_income = rng.random(size) < INCOME_SHARE
+    income_pick = rng.integers(0, len(incomes), size)
+    expense_pick = rng.integers(0, len(expenses), size)
+    names = np.where(
+        is_income,
+        np.array([cat.name for cat in incomes], dtype=object)[income_pick],
+        np.array([cat.name for cat in expenses], dtype=object)[expense_pick]
+    )
+    # Доходы крупные и редкие, расходы мелкие - логнормальное распределение сумм
+    amounts = np.round(np.where(
+        is_income, rng.lognormal(10.5, 0.4, size), rng.lognormal(6.5, 1.0, size)
+    ), 2)
+    offsets = np.sort(rng.integers(0, HISTORY_DAYS * 86_400_000_000, size))
+    dates = np.datetime_as_string(START + offsets.astype("timedelta64[us]"))
+    descriptions = DESCRIPTIONS[rng.integers(0, len(DESCRIPTIONS), size)]
+    
+    transactions = [
+        {
+            "id": i + 1,
+            "amount": amount,
+            "category": name,
+            "date": date,
+            "description": description,
+            "type": "income" if income else "expense"
+        }
+        for i, (amount, name, date, description, income) in enumerate(zip(
+            amounts.tolist(), names.tolist(), dates.tolist(), descriptions.tolist(), is_income.tolist()
+        ))
+    ]
+    return {"username": username, "transactions": transactions, "budgets": {}}
\ No newline at end of file
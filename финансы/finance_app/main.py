@@ -1,6 +1,8 @@
+import sys
 import tkinter as tk
+from tkinter import messagebox
 from ui.login_window import LoginWindow
-from ui.main_window import MainWindow
+from services.background_saver import get_background_saver
 
 class FinanceApp(tk.Tk):
     def __init__(self):
@@ -11,6 +13,9 @@ class FinanceApp(tk.Tk):
         self.minsize(900, 600)
         
         self.current_user = None
+        self.saver = get_background_saver()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.check_save_errors()
         self.show_login()
     
     def show_login(self):
@@ -19,6 +24,8 @@ class FinanceApp(tk.Tk):
         self.login_frame.pack(fill="both", expand=True)
     
     def show_main_window(self):
+        # Главное окно грузится после входа, экрану входа хватает стандартной библиотеки
+        from ui.main_window import MainWindow
         self.clear_window()
         self.main_frame = MainWindow(self, self.current_user, self.on_logout)
         self.main_frame.pack(fill="both", expand=True)
@@ -32,9 +39,25 @@ class FinanceApp(tk.Tk):
         self.show_main_window()
     
     def on_logout(self):
+        self.saver.flush()
         self.current_user = None
         self.show_login()
+    
+    def on_close(self):
+        """Дописывает очередь сохранения перед закрытием окна"""
+        if not self.saver.flush(timeout=10):
+            messagebox.showerror("Ошибка", "Не все изменения удалось сохранить")
+        self.destroy()
+    
+    def check_save_errors(self):
+        """Показывает ошибки фоновой записи; опрашивается из цикла Tk"""
+        for error in self.saver.pop_errors():
+            messagebox.showerror("Ошибка", error)
+        self.after(500, self.check_save_errors)
 
 if __name__ == "__main__":
+    # --trace / --profile включают замеры (см. services/instrumentation.py)
+    from services import instrumentation
+    instrumentation.configure_from_args(sys.argv[1:])
     app = FinanceApp()
     app.mainloop()
\ No newline at end of file
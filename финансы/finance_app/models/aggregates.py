@@ -0,0 +1,74 @@
+import numpy as np
+
+class RunningTotals:
+    """Итоги пользователя, которые обновляются при каждой транзакции,
+    а не пересчитываются по всей истории"""
+    
+    def __init__(self):
+        self.total_income = 0.0
+        self.total_expense = 0.0
+        # Имя категории -> сумма и количество транзакций
+        self.category_sums = {}
+        self.category_counts = {}
+    
+    @property
+    def balance(self) -> float:
+        return self.total_income - self.total_expense
+    
+    def add(self, amount: float, category):
+        if category.type == "income":
+            self.total_income += amount
+        else:
+            self.total_expense += amount
+        self.category_sums[category.name] = self.category_sums.get(category.name, 0.0) + amount
+        self.category_counts[category.name] = self.category_counts.get(category.name, 0) + 1
+    
+    def remove(self, amount: float, category):
+        """Обратное к add - для удаления и правки транзакции"""
+        if category.type == "income":
+            self.total_income -= amount
+        else:
+            self.total_expense -= amount
+        self.category_sums[category.name] -= amount
+        self.category_counts[category.name] -= 1
+        if not self.category_counts[category.name]:
+            del self.category_sums[category.name]
+            del self.category_counts[category.name]
+    
+    def add_columns(self, amounts, category_codes, categories):
+        """Добавляет сразу много строк: суммы по кодам категорий считаются одним bincount"""
+        if not len(amounts):
+            return
+        sums = np.bincount(category_codes, weights=amounts, minlength=len(categories))
+        counts = np.bincount(category_codes, minlength=len(categories))
+        for code, category in enumerate(categories):
+            if not counts[code]:
+                continue
+            if category.type == "income":
+                self.total_income += float(sums[code])
+            else:
+                self.total_expense += float(sums[code])
+            self.category_sums[category.name] = self.category_sums.get(category.name, 0.0) + float(sums[code])
+            self.category_counts[category.name] = self.category_counts.get(category.name, 0) + int(counts[code])
+    
+    def copy(self) -> "RunningTotals":
+        copy = RunningTotals()
+        copy.total_income = self.total_income
+        copy.total_expense = self.total_expense
+        copy.category_sums = dict(self.category_sums)
+        copy.category_counts = dict(self.category_counts)
+        return copy
+    
+    def rebuild(self, store):
+        """Пересчитывает итоги по всему хранилищу (один раз при загрузке)"""
+        self.__init__()
+        alive = store.alive
+        self.add_columns(store.amounts[alive], store.category_codes[alive], store.categories)
+    
+    def summary(self) -> dict:
+        return {
+            "total_income": self.total_income,
+            "total_expense": self.total_expense,
+            "balance": self.balance,
+            "transaction_count": sum(self.category_counts.values())
+        }
\ No newline at end of file
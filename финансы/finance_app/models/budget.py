@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from models.transaction_store import to_timestamp
+from models.rollup import DAY_US
+
+PERIODS = ("week", "month", "year")
+PERIOD_NAMES = {"week": "неделя", "month": "месяц", "year": "год"}
+
+def period_bounds(period: str, now: datetime):
+    """Календарный период, в который попадает now: [начало, конец)"""
+    day = datetime(now.year, now.month, now.day)
+    if period == "week":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    if period == "month":
+        start = day.replace(day=1)
+        return start, (start + timedelta(days=32)).replace(day=1)
+    if period == "year":
+        return datetime(now.year, 1, 1), datetime(now.year + 1, 1, 1)
+    raise ValueError(f"Неизвестный период бюджета: {period}")
+
+class BudgetTracker:
+    """Лимиты расходов по категориям и траты за текущий период.
+    Траты периода считаются один раз по дневным корзинам RollupCube, дальше
+    каждая транзакция правит только бюджет своей категории - O(затронутых бюджетов)"""
+    
+    def __init__(self, user):
+        self.user = user
+        # Формат хранилища: {категория: {"limit": сумма, "period": "week" | "month" | "year"}}
+        self.budgets = {}
+        # Категория -> [начало периода, конец периода (мкс), потрачено]
+        self._windows = {}
+        # Растет при изменении самих бюджетов (не трат) - для кэшей результатов
+        self.version = 0
+    
+    def copy(self, user) -> "BudgetTracker":
+        """Копия лимитов и окон трат для снимка пользователя user"""
+        copy = BudgetTracker(user)
+        copy.budgets = {category: dict(budget) for category, budget in self.budgets.items()}
+        copy._windows = {category: list(window) for category, window in self._windows.items()}
+        copy.version = self.version
+        return copy
+    
+    def reset(self, budgets: dict):
+        self.budgets = budgets
+        self._windows.clear()
+        self.version += 1
+    
+    def set(self, category: str, limit: float, period: str = "month"):
+        if period not in PERIODS:
+            raise ValueError(f"Неизвестный период бюджета: {period}")
+        if limit <= 0:
+            raise ValueError("Лимит должен быть положительным")
+        self.budgets[category] = {"limit": float(limit), "period": period}
+        self._windows.pop(category, None)
+        self.version += 1
+    
+    def remove(self, category: str):
+        self.budgets.pop(category, None)
+        self._windows.pop(category, None)
+        self.version += 1
+    
+    def add(self, timestamp: int, category: str, amount: float):
+        """Учитывает транзакцию; отрицательная сумма - удаление"""
+        window = self._windows.get(category)
+        if window is not None and window[0] <= timestamp < window[1]:
+            window[2] += amount
+    
+    def invalidate(self):
+        """После массовой загрузки траты пересчитываются по корзинам при следующем запросе"""
+        self._windows.clear()
+    
+    def status(self, now: datetime = None) -> list:
+        """Состояние бюджетов на момент now: лимит, потрачено, остаток,
+        прогноз трат к концу периода при текущем темпе и превышение по прогнозу"""
+        now = now or datetime.now()
+        timestamp = to_timestamp(now)
+        result = []
+        for category, budget in sorted(self.budgets.items()):
+            if not isinstance(budget, dict) or budget.get("period", "month") not in PERIODS or not budget.get("limit"):
+                continue
+            period = budget.get("period", "month")
+            start, end, spent = self._window(category, period, now, timestamp)
+            limit = float(budget["limit"])
+            # Темп считается по прошедшим дням периода, включая сегодняшний:
+            # в первые часы прогноз не взлетает, а в течение дня не меняется
+            elapsed = (timestamp // DAY_US - start // DAY_US + 1) * DAY_US
+            projected = max(spent, spent * (end - start) / elapsed)
+            result.append({
+                "category": category,
+                "period": period,
+                "limit": limit,
+                "spent": spent,
+                "remaining": limit - spent,
+                "projected": projected,
+                "overrun": max(0.0, projected - limit)
+            })
+        return result
+    
+    def _window(self, category, period, now, timestamp):
+        window = self._windows.get(category)
+        if window is None or not window[0] <= timestamp < window[1]:
+            start, end = (to_timestamp(bound) for bound in period_bounds(period, now))
+            store = self.user.store
+            codes = [code for code, cat in enumerate(store.categories) if cat.name == category]
+            totals = self.user.rollup.totals(start // DAY_US, end // DAY_US)
+            spent = sum((totals[code][0] for code in codes if code in totals), 0.0)
+            window = self._windows[category] = [start, end, spent]
+        return window
\ No newline at end of file
@@ -0,0 +1,114 @@
+import numpy as np
+from typing import NamedTuple
+from models.transaction_store import to_timestamp
+
+GROUP_KEYS = ("category", "type", "day", "month")
+
+class Query(NamedTuple):
+    """Условия выборки транзакций; None - без ограничения.
+    Неизменяемый и хешируемый, поэтому служит ключом кэша результатов"""
+    start: object = None
+    end: object = None
+    categories: frozenset = None
+    type_: str = None
+    min_amount: float = None
+    max_amount: float = None
+    text: str = None
+
+def make_query(start=None, end=None, categories=None, type_: str = None,
+               min_amount: float = None, max_amount: float = None, text: str = None) -> Query:
+    """Query из условий: даты [start, end), имена категорий (одно или несколько),
+    тип 'income'/'expense', суммы [min_amount, max_amount], подстрока описания без учета регистра"""
+    if type_ not in (None, "income", "expense"):
+        raise ValueError(f"Неизвестный тип транзакций: {type_}")
+    if isinstance(categories, str):
+        categories = (categories,)
+    return Query(
+        start=start,
+        end=end,
+        categories=frozenset(categories) if categories is not None else None,
+        type_=type_,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        text=text.lower() if text else None
+    )
+
+def select(store, query: Query) -> np.ndarray:
+    """Позиции подходящих живых строк хранилища в порядке времени.
+    Диапазон дат отсекается бинарным поиском по индексу времени хранилища,
+    остальные условия складываются в одну маску по оставшимся строкам.
+    Поиск по описанию идет последним и только по уже прошедшим строкам"""
+    start = to_timestamp(query.start) if query.start is not None else None
+    end = to_timestamp(query.end) if query.end is not None else None
+    lo, hi = 0, len(store)
+    # Строки окна вне порядка позиций; None - окно есть срез колонок [lo, hi)
+    window = None
+    if start is not None or end is not None:
+        if store.time_sorted:
+            lo, hi = store.time_bounds(start, end)
+        else:
+            window = store.time_range(start, end)
+    mask = None
+    
+    def column(values):
+        return values[lo:hi] if window is None else values[window]
+    
+    def both(condition):
+        return condition if mask is None else mask & condition
+    
+    if store.deleted:
+        mask = both(column(store.alive))
+    if query.categories is not None:
+        codes = [code for code, cat in enumerate(store.categories) if cat.name in query.categories]
+        mask = both(np.isin(column(store.category_codes), codes))
+    if query.type_ is not None:
+        mask = both(column(store.is_income) == (query.type_ == "income"))
+    if query.min_amount is not None:
+        mask = both(column(store.amounts) >= query.min_amount)
+    if query.max_amount is not None:
+        mask = both(column(store.amounts) <= query.max_amount)
+    
+    if window is not None:
+        positions = window if mask is None else window[mask]
+    else:
+        positions = np.arange(lo, hi) if mask is None else lo + np.flatnonzero(mask)
+    if query.text:
+        descriptions = store.descriptions
+        found = np.fromiter((query.text in descriptions[i].lower() for i in positions.tolist()),
+                            dtype=bool, count=len(positions))
+        positions = positions[found]
+    return positions
+
+def aggregate(store, positions: np.ndarray, by: str = "category") -> dict:
+    """Суммы и число строк по группам: {ключ: (сумма, количество)}.
+    Ключи - имя категории, 'income'/'expense' или дата дня/первого числа месяца"""
+    if by not in GROUP_KEYS:
+        raise ValueError(f"Неизвестный ключ группировки: {by}")
+    amounts = store.amounts[positions]
+    if by == "category":
+        codes = store.category_codes[positions]
+        size = len(store.categories)
+        sums = np.bincount(codes, weights=amounts, minlength=size)
+        counts = np.bincount(codes, minlength=size)
+        return {
+            store.categories[code].name: (float(sums[code]), int(counts[code]))
+            for code in np.flatnonzero(counts).tolist()
+        }
+    if by == "type":
+        income = store.is_income[positions]
+        result = {}
+        for name, rows in (("income", income), ("expense", ~income)):
+            count = int(np.count_nonzero(rows))
+            if count:
+                result[name] = (float(amounts[rows].sum()), count)
+        return result
+    # День или месяц
+    unit = "D" if by == "day" else "M"
+    periods = store.timestamps[positions].view("datetime64[us]").astype(f"datetime64[{unit}]")
+    keys, inverse = np.unique(periods, return_inverse=True)
+    sums = np.bincount(inverse, weights=amounts, minlength=len(keys))
+    counts = np.bincount(inverse, minlength=len(keys))
+    return {
+        key: (total, count)
+        for key, total, count in zip(keys.astype("datetime64[D]").astype(object), sums.tolist(), counts.tolist())
+    }
\ No newline at end of file
@@ -0,0 +1,134 @@
+import numpy as np
+from bisect import bisect_left, insort
+from datetime import date
+
+# Микросекунд в сутках: номер дня = timestamp // DAY_US
+DAY_US = 86_400_000_000
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def day_to_month(day: int) -> int:
+    """Номер месяца от января 1970 для номера дня"""
+    d = date.fromordinal(EPOCH_ORDINAL + day)
+    return (d.year - 1970) * 12 + d.month - 1
+
+def month_start_day(month: int) -> int:
+    return date(1970 + month // 12, month % 12 + 1, 1).toordinal() - EPOCH_ORDINAL
+
+class RollupCube:
+    """Предагрегированные суммы по (день, категория) и (месяц, категория).
+    Период отвечается сложением нескольких корзин вместо прохода по транзакциям"""
+    
+    def __init__(self):
+        # Номер дня / месяца -> {код категории: [сумма, количество]}
+        self.days = {}
+        self.months = {}
+        # Отсортированные ключи для поиска границ периода
+        self._day_keys = []
+        self._month_keys = []
+    
+    def copy(self) -> "RollupCube":
+        """Копия корзин для чтения в другом потоке"""
+        copy = RollupCube()
+        copy.days = {day: {code: list(cell) for code, cell in bucket.items()} for day, bucket in self.days.items()}
+        copy.months = {month: {code: list(cell) for code, cell in bucket.items()} for month, bucket in self.months.items()}
+        copy._day_keys = list(self._day_keys)
+        copy._month_keys = list(self._month_keys)
+        return copy
+    
+    def add(self, timestamp: int, category_code: int, amount: float, count: int = 1):
+        """Кладет строку в корзины; count=-1 с той же суммой убирает ее обратно"""
+        day = timestamp // DAY_US
+        self._add_bucket(self.days, self._day_keys, day, category_code, amount, count)
+        self._add_bucket(self.months, self._month_keys, day_to_month(day), category_code, amount, count)
+    
+    def remove(self, timestamp: int, category_code: int, amount: float):
+        self.add(timestamp, category_code, -amount, -1)
+    
+    def add_columns(self, timestamps, category_codes, amounts):
+        """Раскладывает много строк по корзинам за один векторный проход"""
+        if not len(amounts):
+            return
+        codes = np.asarray(category_codes, dtype=np.int64)
+        width = int(codes.max()) + 1
+        days = np.asarray(timestamps, dtype=np.int64) // DAY_US
+        months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        for buckets, keys, periods in ((self.days, self._day_keys, days),
+                                       (self.months, self._month_keys, months)):
+            combined, inverse = np.unique(periods * width + codes, return_inverse=True)
+            sums = np.bincount(inverse, weights=amounts)
+            counts = np.bincount(inverse)
+            for key, total, count in zip(combined.tolist(), sums.tolist(), counts.tolist()):
+                period, code = divmod(key, width)
+                self._add_bucket(buckets, keys, period, code, total, count)
+    
+    def totals(self, start_day: int = None, end_day: int = None) -> dict:
+        """Суммы {код категории: [сумма, количество]} за дни [start_day, end_day)"""
+        result = {}
+        if not self._day_keys:
+            return result
+        if start_day is None:
+            start_day = self._day_keys[0]
+        if end_day is None:
+            end_day = self._day_keys[-1] + 1
+        if start_day >= end_day:
+            return result
+        
+        first_month = day_to_month(start_day)
+        last_month = day_to_month(end_day - 1)
+        # Полные месяцы берутся из месячных корзин, неполные края - из дневных
+        full_from = first_month if month_start_day(first_month) == start_day else first_month + 1
+        full_to = last_month if month_start_day(last_month + 1) == end_day else last_month - 1
+        if full_from > full_to:
+            self._sum_range(result, self.days, self._day_keys, start_day, end_day)
+            return result
+        self._sum_range(result, self.days, self._day_keys, start_day, month_start_day(full_from))
+        self._sum_range(result, self.months, self._month_keys, full_from, full_to + 1)
+        self._sum_range(result, self.days, self._day_keys, month_start_day(full_to + 1), end_day)
+        return result
+    
+    def daily_matrix(self, start_day: int, end_day: int, width: int) -> np.ndarray:
+        """Суммы за дни [start_day, end_day) по кодам категорий [0, width): матрица дни x коды.
+        Строится только по корзинам этих дней, сколь бы длинной ни была история;
+        дни без транзакций - нули"""
+        result = np.zeros((max(end_day - start_day, 0), width))
+        rows, codes, sums = [], [], []
+        keys = self._day_keys
+        for i in range(bisect_left(keys, start_day), bisect_left(keys, end_day)):
+            for code, (amount, _) in self.days[keys[i]].items():
+                if code < width:
+                    rows.append(keys[i] - start_day)
+                    codes.append(code)
+                    sums.append(amount)
+        if rows:
+            result[rows, codes] = sums
+        return result
+    
+    @staticmethod
+    def _add_bucket(buckets, keys, period, code, amount, count):
+        bucket = buckets.get(period)
+        if bucket is None:
+            bucket = buckets[period] = {}
+            insort(keys, period)
+        cell = bucket.get(code)
+        if cell is None:
+            bucket[code] = [amount, count]
+        else:
+            cell[0] += amount
+            cell[1] += count
+            if not cell[1]:
+                # Последняя строка ячейки удалена - не оставляем нулевые корзины
+                del bucket[code]
+                if not bucket:
+                    del buckets[period]
+                    keys.pop(bisect_left(keys, period))
+    
+    @staticmethod
+    def _sum_range(result, buckets, keys, start, end):
+        for i in range(bisect_left(keys, start), bisect_left(keys, end)):
+            for code, (amount, count) in buckets[keys[i]].items():
+                cell = result.get(code)
+                if cell is None:
+                    result[code] = [amount, count]
+                else:
+                    cell[0] += amount
+                    cell[1] += count
\ No newline at end of file
@@ -1,16 +1,22 @@
-import pandas as pd
 from datetime import datetime
 from typing import Optional
 
 class Transaction:
-    def __init__(self, amount: float, category, date: Optional[datetime] = None, description: str = ""):
+    # Без __dict__: объекты создаются на лету из колонок TransactionStore
+    __slots__ = ("amount", "category", "date", "description", "id")
+    
+    def __init__(self, amount: float, category, date: Optional[datetime] = None, description: str = "",
+                 id: Optional[int] = None):
         self.amount = amount
         self.category = category
         self.date = date if date else datetime.now()
         self.description = description
+        # Постоянный номер внутри истории пользователя; выдается хранилищем при добавлении
+        self.id = id
     
     def to_dict(self) -> dict:
         return {
+            "id": self.id,
             "amount": self.amount,
             "category": self.category.name,
             "date": self.date.isoformat(),
@@ -0,0 +1,460 @@
+import numpy as np
+from datetime import datetime, timedelta
+from models.transaction import Transaction
+
+# Даты хранятся как int64 микросекунд от этой точки (наивное время, как в Transaction.date)
+EPOCH = datetime(1970, 1, 1)
+
+def to_timestamp(date: datetime) -> int:
+    return (date - EPOCH) // timedelta(microseconds=1)
+
+def from_timestamp(timestamp: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(timestamp))
+
+def columns_to_dicts(categories, ids, amounts, timestamps, category_codes, descriptions,
+                     alive=None, batch: int = 10_000):
+    """Строки из готовых колонок в формате Transaction.to_dict (alive - какие строки выдавать)"""
+    for batch_start in range(0, len(ids), batch):
+        batch_stop = min(batch_start + batch, len(ids))
+        dates = np.datetime_as_string(np.asarray(timestamps[batch_start:batch_stop], dtype=np.int64).view("datetime64[us]"))
+        alive_rows = alive[batch_start:batch_stop].tolist() if alive is not None else [True] * (batch_stop - batch_start)
+        rows = zip(np.asarray(ids[batch_start:batch_stop]).tolist(),
+                   np.asarray(amounts[batch_start:batch_stop], dtype=np.float64).tolist(),
+                   np.asarray(category_codes[batch_start:batch_stop]).tolist(),
+                   dates.tolist(), list(descriptions[batch_start:batch_stop]), alive_rows)
+        for id_, amount, code, date, description, is_alive in rows:
+            if not is_alive:
+                continue
+            category = categories[code]
+            yield {
+                "id": id_,
+                "amount": amount,
+                "category": category.name,
+                "date": date,
+                "description": description,
+                "type": category.type
+            }
+
+# Журнал правок длиннее max(этого, числа строк) сбрасывается - производное строится заново
+EDIT_LOG_MIN = 1024
+
+class TransactionStore:
+    """Транзакции пользователя в параллельных колонках numpy.
+    Снаружи выглядит как список Transaction: объекты создаются только при обращении к строке.
+    
+    У каждой строки постоянный id; id возрастают вместе с позицией, поэтому поиск
+    позиции по id - бинарный поиск по колонке без отдельного словаря.
+    Удаленная строка остается на месте с пометкой (надгробием), пока их не станет много.
+    
+    Порядок по времени хранится отдельным индексом: позиции по возрастанию даты и сами
+    даты в этом порядке. Пока транзакции приходят по порядку дат, индекс совпадает
+    с позициями и не хранится вовсе; строки не по порядку вливаются в него слиянием"""
+    INITIAL_CAPACITY = 64
+    _COLUMNS = ("_amount", "_timestamp", "_category_code", "_is_income", "_id", "_alive")
+    
+    def __init__(self):
+        self._size = 0
+        self._amount = np.empty(self.INITIAL_CAPACITY, dtype=np.float64)
+        self._timestamp = np.empty(self.INITIAL_CAPACITY, dtype=np.int64)
+        self._category_code = np.empty(self.INITIAL_CAPACITY, dtype=np.int16)
+        self._is_income = np.empty(self.INITIAL_CAPACITY, dtype=np.bool_)
+        self._id = np.empty(self.INITIAL_CAPACITY, dtype=np.int64)
+        self._alive = np.empty(self.INITIAL_CAPACITY, dtype=np.bool_)
+        self.next_id = 1
+        # Число удаленных, но еще не вычищенных строк
+        self.deleted = 0
+        # Индекс времени: позиции по возрастанию даты и их даты (int64).
+        # None - строки и так упорядочены по времени, индекс - сами позиции
+        self._order = None
+        self._order_ts = None
+        # Массивы под индекс с запасом емкости: _order и _order_ts - их начальные срезы
+        self._order_buffer = None
+        self._order_ts_buffer = None
+        self.descriptions = []
+        # Код категории - индекс в этом списке
+        self.categories = []
+        self._codes = {}
+        # version растет при любом изменении.
+        # Позиции строк, переписанных на месте (set_row), копятся в журнале edited:
+        # производные данные (кадр pandas, индексы сортировки) запоминают, сколько записей
+        # уже учли, и обновляют только эти строки. Удаление лишь ставит надгробие и в журнал
+        # не попадает. Сдвиг позиций (compact, вставка в середину) увеличивает layout_version
+        # и начинает журнал заново - тогда производное строится целиком
+        self.version = 0
+        self.layout_version = 0
+        self.edited = []
+        # Коды описаний (индексы в description_names) - строятся по требованию
+        # и догоняют дозапись и правки так же, как прочие производные данные
+        self.description_names = []
+        self._description_index = {}
+        self._description_codes = np.empty(0, dtype=np.int32)
+        self._description_rows = 0
+        self._description_layout = None
+        self._description_edits = 0
+    
+    def __len__(self):
+        """Число строк в колонках, включая удаленные (см. deleted)"""
+        return self._size
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("transaction index out of range")
+        return Transaction(
+            amount=float(self._amount[index]),
+            category=self.categories[self._category_code[index]],
+            date=from_timestamp(self._timestamp[index]),
+            description=self.descriptions[index],
+            id=int(self._id[index])
+        )
+    
+    def __iter__(self):
+        """Живые транзакции по порядку"""
+        for i in range(self._size):
+            if self._alive[i]:
+                yield self[i]
+    
+    def to_dicts(self, start: int = 0, stop: int = None, batch: int = 10_000):
+        """Строки [start, stop) в формате Transaction.to_dict без создания объектов Transaction"""
+        stop = self._size if stop is None else stop
+        return columns_to_dicts(self.categories, self._id[start:stop], self._amount[start:stop],
+                                self._timestamp[start:stop], self._category_code[start:stop],
+                                self.descriptions[start:stop], self._alive[start:stop], batch)
+    
+    # Колонки - представления без копирования, длиной ровно в число транзакций
+    @property
+    def amounts(self) -> np.ndarray:
+        return self._amount[:self._size]
+    
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamp[:self._size]
+    
+    @property
+    def category_codes(self) -> np.ndarray:
+        return self._category_code[:self._size]
+    
+    @property
+    def is_income(self) -> np.ndarray:
+        return self._is_income[:self._size]
+    
+    @property
+    def ids(self) -> np.ndarray:
+        return self._id[:self._size]
+    
+    @property
+    def alive(self) -> np.ndarray:
+        """Маска живых строк (False - удаленная строка)"""
+        return self._alive[:self._size]
+    
+    @property
+    def time_sorted(self) -> bool:
+        """Строки упорядочены по времени - диапазон дат есть срез колонок"""
+        return self._order is None
+    
+    def time_bounds(self, start: int = None, end: int = None):
+        """Границы [lo, hi) строк с датами в [start, end) (мкс) в порядке времени -
+        бинарным поиском по индексу. Для упорядоченной истории это срез колонок"""
+        timestamps = self.timestamps if self._order is None else self._order_ts
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+        hi = self._size if end is None else max(lo, int(np.searchsorted(timestamps, end, side="left")))
+        return lo, hi
+    
+    def time_range(self, start: int = None, end: int = None) -> np.ndarray:
+        """Позиции строк (включая удаленные) с датами в [start, end) в порядке времени"""
+        lo, hi = self.time_bounds(start, end)
+        if self._order is None:
+            return np.arange(lo, hi)
+        return self._order[lo:hi]
+    
+    def time_order(self) -> np.ndarray:
+        """Все позиции в порядке времени; изменять массив нельзя"""
+        return self.time_range()
+    
+    def snapshot(self) -> "TransactionStore":
+        """Копия для чтения без замка пользователя. Колонки копируются - строки правятся
+        на месте; индекс времени и коды описаний общие: они меняются только заменой
+        массивов или дозаписью за конец выданного среза. Изменять копию нельзя"""
+        copy = TransactionStore.__new__(TransactionStore)
+        copy.__dict__.update(self.__dict__)
+        for name in self._COLUMNS:
+            setattr(copy, name, getattr(self, name)[:self._size].copy())
+        copy.descriptions = list(self.descriptions)
+        copy.categories = list(self.categories)
+        copy._codes = dict(self._codes)
+        copy.edited = list(self.edited)
+        copy._order_buffer, copy._order_ts_buffer = self._order, self._order_ts
+        copy.description_names = list(self.description_names)
+        copy._description_index = dict(self._description_index)
+        copy._description_codes = self._description_codes[:self._description_rows]
+        return copy
+    
+    def description_codes(self) -> np.ndarray:
+        """Код описания каждой строки (индекс в description_names); изменять массив нельзя.
+        Словарь описаний строится один раз, дальше кодируются только новые и правленые строки"""
+        if self._description_layout != self.layout_version:
+            self._description_codes = np.empty(0, dtype=np.int32)
+            self._description_rows = 0
+            self._description_layout = self.layout_version
+            self._description_edits = 0
+        codes, rows = self._description_codes, self._description_rows
+        edited = [p for p in dict.fromkeys(self.edited[self._description_edits:]) if p < rows]
+        if edited:
+            # Выданные раньше массивы не меняются
+            codes = codes.copy()
+            for position in edited:
+                codes[position] = self._description_code(self.descriptions[position])
+        if rows < self._size:
+            if self._size > len(codes):
+                grown = np.empty(max(self._size, 2 * len(codes)), dtype=np.int32)
+                grown[:rows] = codes[:rows]
+                codes = grown
+            codes[rows:self._size] = [self._description_code(d) for d in self.descriptions[rows:self._size]]
+        self._description_codes = codes
+        self._description_rows = self._size
+        self._description_edits = len(self.edited)
+        return codes[:self._size]
+    
+    def _description_code(self, description: str) -> int:
+        code = self._description_index.get(description)
+        if code is None:
+            code = self._description_index[description] = len(self.description_names)
+            self.description_names.append(description)
+        return code
+    
+    def position_of(self, transaction_id: int):
+        """Позиция строки с этим id (живой или удаленной) или None"""
+        i = int(np.searchsorted(self.ids, transaction_id))
+        if i < self._size and self._id[i] == transaction_id:
+            return i
+        return None
+    
+    def category_code(self, category) -> int:
+        """Код категории в этом хранилище; новая категория регистрируется"""
+        code = self._codes.get(category.name)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self._codes[category.name] = code
+        return code
+    
+    def append(self, transaction: Transaction) -> int:
+        """Добавляет транзакцию в конец и возвращает ее позицию"""
+        if transaction.id is None:
+            transaction.id = self.next_id
+        elif transaction.id < self.next_id:
+            raise ValueError(f"id {transaction.id} меньше уже выданных")
+        if self._size == len(self._amount):
+            self._grow(self._size + 1)
+        i = self._size
+        self._write_row(i, transaction)
+        self._id[i] = transaction.id
+        self._alive[i] = True
+        self.descriptions.append(transaction.description)
+        self.next_id = transaction.id + 1
+        self._size += 1
+        self._index_rows(i, i + 1)
+        self.version += 1
+        return i
+    
+    def extend_columns(self, amounts, timestamps, category_codes, descriptions, ids=None):
+        """Добавляет сразу много строк из готовых колонок (коды - из category_code).
+        ids должны возрастать; без них выдаются новые"""
+        count = len(amounts)
+        if ids is None:
+            ids = np.arange(self.next_id, self.next_id + count, dtype=np.int64)
+        elif count and (ids[0] < self.next_id or np.any(np.diff(ids) <= 0)):
+            raise ValueError("id транзакций должны возрастать")
+        if self._size + count > len(self._amount):
+            self._grow(self._size + count)
+        start, end = self._size, self._size + count
+        category_codes = np.asarray(category_codes, dtype=np.int16)
+        self._amount[start:end] = amounts
+        self._timestamp[start:end] = timestamps
+        self._category_code[start:end] = category_codes
+        income_codes = [code for code, cat in enumerate(self.categories) if cat.type == "income"]
+        self._is_income[start:end] = np.isin(category_codes, income_codes)
+        self._id[start:end] = ids
+        self._alive[start:end] = True
+        self.descriptions.extend(descriptions)
+        if count:
+            self.next_id = int(ids[-1]) + 1
+        self._size = end
+        self._index_rows(start, end)
+        self.version += 1
+    
+    def set_row(self, position: int, transaction: Transaction):
+        """Заменяет данные строки, id и позиция сохраняются"""
+        old_timestamp = int(self._timestamp[position])
+        self._write_row(position, transaction)
+        self.descriptions[position] = transaction.description
+        transaction.id = int(self._id[position])
+        self._reindex_row(position, old_timestamp)
+        self.edited.append(position)
+        if len(self.edited) > max(EDIT_LOG_MIN, self._size):
+            self._relayout()
+        self._changed()
+    
+    def kill(self, position: int):
+        """Помечает строку удаленной - за O(1), без сдвига колонок"""
+        self._alive[position] = False
+        self.deleted += 1
+        self._changed()
+    
+    def restore(self, transaction: Transaction) -> int:
+        """Возвращает удаленную транзакцию с ее прежним id; возвращает позицию"""
+        position = self.position_of(transaction.id)
+        if position is not None:
+            self.set_row(position, transaction)
+            if not self._alive[position]:
+                self._alive[position] = True
+                self.deleted -= 1
+            return position
+        if transaction.id >= self.next_id:
+            return self.append(transaction)
+        # Строку уже вычистили - вставляем на место по id
+        position = int(np.searchsorted(self.ids, transaction.id))
+        self._grow(self._size + 1, insert_at=position)
+        self._write_row(position, transaction)
+        self._id[position] = transaction.id
+        self._alive[position] = True
+        self.descriptions.insert(position, transaction.description)
+        self._size += 1
+        self._index_inserted_row(position)
+        self._relayout()
+        self._changed()
+        return position
+    
+    def compact(self):
+        """Вычищает удаленные строки; позиции строк после этого меняются"""
+        if not self.deleted:
+            return
+        keep = self.alive.copy()
+        for name in self._COLUMNS:
+            # Новые массивы, а не сдвиг на месте - ранее выданные представления не портятся
+            column = getattr(self, name)
+            kept = column[:self._size][keep]
+            new = np.empty(len(column), dtype=column.dtype)
+            new[:len(kept)] = kept
+            setattr(self, name, new)
+        self.descriptions = [d for d, alive in zip(self.descriptions, keep.tolist()) if alive]
+        self._size = len(self.descriptions)
+        self.deleted = 0
+        if self._order is not None:
+            # Новые позиции оставшихся строк; порядок времени между ними не меняется
+            new_positions = np.cumsum(keep) - 1
+            kept = keep[self._order]
+            self._set_order(new_positions[self._order[kept]], self._order_ts[kept])
+            if not np.any(np.diff(self._order) < 0):
+                self._set_order(None, None)
+        self._relayout()
+        self._changed()
+    
+    def _write_row(self, i: int, transaction: Transaction):
+        self._amount[i] = transaction.amount
+        self._timestamp[i] = to_timestamp(transaction.date)
+        self._category_code[i] = self.category_code(transaction.category)
+        self._is_income[i] = transaction.category.type == "income"
+    
+    def _in_order(self, position: int) -> bool:
+        """Строка в этой позиции не нарушает порядок по времени с соседями"""
+        ts = self._timestamp
+        return not ((position > 0 and ts[position - 1] > ts[position])
+                    or (position + 1 < self._size and ts[position] > ts[position + 1]))
+    
+    # Индекс времени меняется заменой массивов или дозаписью за его конец:
+    # выданные из него срезы остаются верными
+    def _index_rows(self, start: int, end: int):
+        """Вливает новые строки [start, end) в индекс времени.
+        Сортируются только новые строки, с индексом они сливаются за O(n + k log k)"""
+        ts = self._timestamp
+        if self._order is None:
+            if not np.any(np.diff(ts[max(start - 1, 0):end]) < 0):
+                return
+            # Первая строка не по порядку: до нее индекс совпадал с позициями
+            self._set_order(np.arange(start, dtype=np.int64), ts[:start].copy())
+        new = start + np.argsort(ts[start:end], kind="stable")
+        self._merge(new, ts[new])
+    
+    def _reindex_row(self, position: int, old_timestamp: int):
+        """Переносит в индексе строку, у которой изменилась дата"""
+        if self._timestamp[position] == old_timestamp:
+            return
+        if self._order is None:
+            if self._in_order(position):
+                return
+            order_ts = self._timestamp[:self._size].copy()
+            order_ts[position] = old_timestamp
+            self._set_order(np.arange(self._size, dtype=np.int64), order_ts)
+        # Строка ищется среди строк с прежней датой
+        lo = int(np.searchsorted(self._order_ts, old_timestamp, side="left"))
+        hi = int(np.searchsorted(self._order_ts, old_timestamp, side="right"))
+        slot = lo + int(np.flatnonzero(self._order[lo:hi] == position)[0])
+        self._set_order(np.delete(self._order, slot), np.delete(self._order_ts, slot))
+        self._merge(np.array([position]), self._timestamp[position:position + 1])
+    
+    def _index_inserted_row(self, position: int):
+        """Учитывает строку, вставленную в середину колонок: позиции после нее сдвинулись"""
+        if self._order is None:
+            if self._in_order(position):
+                return
+            others = np.delete(np.arange(self._size, dtype=np.int64), position)
+            self._set_order(others, self._timestamp[others])
+        else:
+            self._set_order(np.where(self._order >= position, self._order + 1, self._order), self._order_ts)
+        self._merge(np.array([position]), self._timestamp[position:position + 1])
+    
+    def _merge(self, positions: np.ndarray, timestamps: np.ndarray):
+        """Вставляет упорядоченные по времени строки в индекс; при равных датах - после имеющихся"""
+        size = len(self._order)
+        if not size or timestamps[0] >= self._order_ts[-1]:
+            # Строки не раньше последней - дописываем в запас емкости, как колонки
+            end = size + len(positions)
+            if end > len(self._order_buffer):
+                capacity = max(end, 2 * len(self._order_buffer))
+                for name in ("_order_buffer", "_order_ts_buffer"):
+                    old = getattr(self, name)
+                    new = np.empty(capacity, dtype=np.int64)
+                    new[:size] = old[:size]
+                    setattr(self, name, new)
+            self._order_buffer[size:end] = positions
+            self._order_ts_buffer[size:end] = timestamps
+            self._order = self._order_buffer[:end]
+            self._order_ts = self._order_ts_buffer[:end]
+            return
+        slots = np.searchsorted(self._order_ts, timestamps, side="right")
+        self._set_order(np.insert(self._order, slots, positions), np.insert(self._order_ts, slots, timestamps))
+    
+    def _set_order(self, order, order_ts):
+        """Заменяет индекс новыми массивами (без запаса емкости)"""
+        self._order = self._order_buffer = order
+        self._order_ts = self._order_ts_buffer = order_ts
+    
+    def _changed(self):
+        # Изменились уже существующие строки
+        self.version += 1
+    
+    def _relayout(self):
+        # Позиции строк сдвинулись - журнал правок больше не относится к ним
+        self.layout_version += 1
+        self.edited = []
+    
+    def _grow(self, min_capacity: int, insert_at: int = None):
+        """Переносит колонки в новые массивы; с insert_at - со свободным местом под строку в этой позиции"""
+        if insert_at is None:
+            capacity = max(min_capacity, 2 * len(self._amount))
+        else:
+            capacity = max(min_capacity, len(self._amount))
+        # Старые массивы не меняются, поэтому ранее выданные представления остаются верными
+        for name in self._COLUMNS:
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            if insert_at is None:
+                new[:self._size] = old[:self._size]
+            else:
+                new[:insert_at] = old[:insert_at]
+                new[insert_at + 1:self._size + 1] = old[insert_at:self._size]
+            setattr(self, name, new)
\ No newline at end of file
@@ -1,52 +1,341 @@
-import pandas as pd
-from typing import List
+import threading
+import numpy as np
+from collections import deque, OrderedDict
 from models.transaction import Transaction
+from models.transaction_store import TransactionStore
+from models.query import Query, make_query, select as select_rows, aggregate as aggregate_rows
+from models.aggregates import RunningTotals
+from models.rollup import RollupCube
+from models.budget import BudgetTracker
+
+# Сколько последних изменений можно отменить
+UNDO_DEPTH = 100
+# Удаленные строки вычищаются из колонок, когда их больше четверти (и не меньше этого числа)
+COMPACT_DELETED_MIN = 1024
+# Сколько результатов запросов помнится для текущей версии истории
+QUERY_CACHE_SIZE = 64
+# Колонки кэша DataFrame: категория и тип хранятся кодами
+FRAME_COLUMNS = (
+    ("amount", np.float64),
+    ("category", np.int16),
+    ("date", "datetime64[us]"),
+    ("description", object),
+    ("type", np.int8),
+    ("signed_amount", np.float64),
+)
 
 class User:
     def __init__(self, username: str):
         self.username = username
-        self.transactions: List[Transaction] = []
-        self.budgets = {}
+        self.store = TransactionStore()
+        self.totals = RunningTotals()
+        self.rollup = RollupCube()
+        self.budget_tracker = BudgetTracker(self)
+        # Отчеты считаются в фоновом потоке: изменения истории и чтение для анализа идут под этим замком
+        self.lock = threading.RLock()
+        # Кэш DataFrame по всем строкам хранилища, включая удаленные: колонки в массивах с запасом
+        # емкости (новые строки дописываются за конец), сколько строк в них заполнено,
+        # для какой раскладки позиций и сколько записей журнала правок store.edited учтено
+        self._frame_columns = None
+        self._frame_rows = 0
+        self._frame_layout = None
+        self._frame_edits = 0
+        # Выданный кадр (без удаленных строк) и версия данных, для которой он собран
+        self._frame = None
+        self._frame_version = None
+        # Стек отмены: ("add" | "edit" | "delete", транзакция до изменения)
+        self._undo = deque(maxlen=UNDO_DEPTH)
+        # Результаты запросов для версии истории _queries_version: ключ -> результат
+        self._queries = OrderedDict()
+        self._queries_version = None
+    
+    @property
+    def transactions(self) -> TransactionStore:
+        """История в виде последовательности Transaction поверх колоночного хранилища"""
+        return self.store
+    
+    @property
+    def budgets(self) -> dict:
+        """Лимиты по категориям в формате хранилища: {категория: {"limit": ..., "period": ...}}"""
+        return self.budget_tracker.budgets
+    
+    @budgets.setter
+    def budgets(self, budgets: dict):
+        with self.lock:
+            self.budget_tracker.reset(budgets)
+    
+    def set_budget(self, category: str, limit: float, period: str = "month"):
+        with self.lock:
+            self.budget_tracker.set(category, limit, period)
+    
+    def remove_budget(self, category: str):
+        with self.lock:
+            self.budget_tracker.remove(category)
+    
+    def budget_status(self, now=None) -> list:
+        """Потрачено / осталось / прогноз по каждому бюджету (см. BudgetTracker.status)"""
+        with self.lock:
+            return self.budget_tracker.status(now)
+    
+    @property
+    def version(self) -> int:
+        """Номер версии данных: меняется при каждом изменении истории"""
+        return self.store.version
+    
+    def snapshot(self) -> "User":
+        """Копия данных на текущую версию для расчета отчетов без замка: правки истории
+        в это время ее не трогают. Коды описаний сначала догоняют историю здесь,
+        чтобы копия не строила их заново. Изменять копию нельзя"""
+        with self.lock:
+            self.store.description_codes()
+            copy = User(self.username)
+            copy.store = self.store.snapshot()
+            copy.totals = self.totals.copy()
+            copy.rollup = self.rollup.copy()
+            copy.budget_tracker = self.budget_tracker.copy(copy)
+            return copy
     
     def add_transaction(self, transaction: Transaction):
-        self.transactions.append(transaction)
+        with self.lock:
+            i = self.store.append(transaction)
+            self.totals.add(transaction.amount, transaction.category)
+            self.rollup.add(int(self.store.timestamps[i]), int(self.store.category_codes[i]), transaction.amount)
+            self.budget_tracker.add(int(self.store.timestamps[i]), transaction.category.name, transaction.amount)
+            self._undo.append(("add", transaction))
+    
+    def get_transaction(self, transaction_id: int):
+        with self.lock:
+            position = self.store.position_of(transaction_id)
+            if position is None or not self.store.alive[position]:
+                return None
+            return self.store[position]
+    
+    def edit_transaction(self, transaction_id: int, amount: float = None, category=None,
+                         date=None, description: str = None) -> Transaction:
+        """Меняет поля транзакции (None - оставить как было).
+        Итоги и свертка правятся только на эту строку, кадр - при следующем чтении"""
+        with self.lock:
+            position = self._live_position(transaction_id)
+            old = self.store[position]
+            new = Transaction(
+                amount=old.amount if amount is None else amount,
+                category=old.category if category is None else category,
+                date=old.date if date is None else date,
+                description=old.description if description is None else description,
+                id=old.id
+            )
+            self._forget_row(position)
+            self.store.set_row(position, new)
+            self._count_row(position)
+            self._undo.append(("edit", old))
+            return new
+    
+    def delete_transaction(self, transaction_id: int) -> Transaction:
+        """Удаляет транзакцию: строка помечается удаленной, колонки не сдвигаются"""
+        with self.lock:
+            position = self._live_position(transaction_id)
+            old = self.store[position]
+            self._forget_row(position)
+            self.store.kill(position)
+            self._undo.append(("delete", old))
+            if self.store.deleted > max(COMPACT_DELETED_MIN, len(self.store) // 4):
+                # Позиции строк меняются - кадр соберется заново при следующем обращении
+                self.store.compact()
+            return old
+    
+    def undo(self):
+        """Отменяет последнее добавление, правку или удаление.
+        Возвращает изменение для хранилища: ("add", транзакция), ("edit", транзакция),
+        ("delete", id) или None, если отменять нечего"""
+        with self.lock:
+            if not self._undo:
+                return None
+            kind, transaction = self._undo.pop()
+            if kind == "add":
+                self.delete_transaction(transaction.id)
+                self._undo.pop()
+                return ("delete", transaction.id)
+            if kind == "edit":
+                restored = self.edit_transaction(transaction.id, transaction.amount, transaction.category,
+                                                 transaction.date, transaction.description)
+                self._undo.pop()
+                return ("edit", restored)
+            self._restore(transaction)
+            return ("add", transaction)
+    
+    def _restore(self, transaction: Transaction):
+        position = self.store.restore(transaction)
+        self._count_row(position)
+    
+    def _live_position(self, transaction_id: int) -> int:
+        position = self.store.position_of(transaction_id)
+        if position is None or not self.store.alive[position]:
+            raise KeyError(f"Транзакция {transaction_id} не найдена")
+        return position
+    
+    def _forget_row(self, position: int):
+        store = self.store
+        amount = float(store.amounts[position])
+        category = store.categories[store.category_codes[position]]
+        self.totals.remove(amount, category)
+        self.rollup.remove(int(store.timestamps[position]), int(store.category_codes[position]), amount)
+        self.budget_tracker.add(int(store.timestamps[position]), category.name, -amount)
     
-    def get_transactions_dataframe(self) -> pd.DataFrame:
-        """Конвертирует транзакции в Pandas DataFrame для анализа"""
-        if not self.transactions:
+    def _count_row(self, position: int):
+        store = self.store
+        amount = float(store.amounts[position])
+        category = store.categories[store.category_codes[position]]
+        self.totals.add(amount, category)
+        self.rollup.add(int(store.timestamps[position]), int(store.category_codes[position]), amount)
+        self.budget_tracker.add(int(store.timestamps[position]), category.name, amount)
+    
+    def extend_columns(self, amounts, timestamps, category_codes, descriptions, ids=None):
+        """Массовое добавление готовых колонок (загрузка, импорт); коды - из store.category_code"""
+        amounts = np.asarray(amounts, dtype=np.float64)
+        category_codes = np.asarray(category_codes, dtype=np.int16)
+        with self.lock:
+            self.store.extend_columns(amounts, timestamps, category_codes, descriptions, ids)
+            self.totals.add_columns(amounts, category_codes, self.store.categories)
+            self.rollup.add_columns(timestamps, category_codes, amounts)
+            self.budget_tracker.invalidate()
+    
+    def get_transactions_dataframe(self) -> "pd.DataFrame":
+        """Конвертирует транзакции в Pandas DataFrame для анализа.
+        Кадр кэшируется и общий для всех вызывающих - изменять его нельзя"""
+        # pandas нужен только аналитике - не грузим его при старте приложения
+        import pandas as pd
+        store = self.store
+        if not len(store):
             return pd.DataFrame()
+        if self._frame is not None and self._frame_version == store.version:
+            return self._frame
         
-        data = [t.to_dict() for t in self.transactions]
-        df = pd.DataFrame(data)
+        # Изменения истории только отмечаются в хранилище - кадр догоняет их здесь
+        size = len(store)
+        columns = self._frame_columns
+        if columns is None or self._frame_layout != store.layout_version or self._frame_rows > size:
+            columns = self._reserve_frame_columns(None, 0, size)
+            self._write_frame_rows(columns, slice(0, size))
+        else:
+            edited = [p for p in dict.fromkeys(store.edited[self._frame_edits:]) if p < self._frame_rows]
+            if edited:
+                columns = dict(columns)
+                self._write_frame_rows(columns, np.array(edited), copy=True)
+            if self._frame_rows < size:
+                # Старые строки не сдвигались - дописываем только новые в запас емкости
+                columns = self._reserve_frame_columns(columns, self._frame_rows, size)
+                self._write_frame_rows(columns, slice(self._frame_rows, size))
+        self._frame_columns = columns
+        self._frame_rows = size
+        self._frame_layout = store.layout_version
+        self._frame_edits = len(store.edited)
         
-        if not df.empty:
-            df['date'] = pd.to_datetime(df['date'])
-            df['amount'] = pd.to_numeric(df['amount'])
+        # Удаленные строки отсекаются по маске при чтении, а не вырезаются при каждом удалении
+        self._frame = self._build_frame(columns, size, store.alive if store.deleted else None)
+        self._frame_version = store.version
+        return self._frame
+    
+    def _reserve_frame_columns(self, columns, rows: int, size: int) -> dict:
+        """Колонки кэша емкостью не меньше size: при нехватке - вдвое больше, первые rows строк переносятся"""
+        if columns is not None and size <= len(columns["amount"]):
+            return columns
+        capacity = max(size, 2 * len(columns["amount"])) if columns is not None else size
+        reserved = {}
+        for name, dtype in FRAME_COLUMNS:
+            reserved[name] = np.empty(capacity, dtype=dtype)
+            if columns is not None:
+                reserved[name][:rows] = columns[name][:rows]
+        return reserved
+    
+    def _write_frame_rows(self, columns: dict, rows, copy: bool = False):
+        """Переписывает строки кэша (срез или массив позиций) из колонок хранилища.
+        copy=True - для строк, уже попавших в выданные кадры: они делят память с колонками,
+        поэтому колонка, в которой значения правда меняются, пишется в копию"""
+        store = self.store
+        amounts = store.amounts[rows]
+        is_income = store.is_income[rows]
+        if isinstance(rows, slice):
+            descriptions = store.descriptions[rows]
+        else:
+            descriptions = np.array([store.descriptions[p] for p in rows.tolist()], dtype=object)
+        values = {
+            "amount": amounts,
+            "category": store.category_codes[rows],
+            "date": store.timestamps[rows].view("datetime64[us]"),
+            "description": descriptions,
+            "type": is_income.view(np.int8),
             # Для расходов делаем отрицательные значения
-            df['signed_amount'] = df.apply(
-                lambda x: -abs(x['amount']) if x['type'] == 'expense' else abs(x['amount']), 
-                axis=1
-            )
-        
-        return df
+            "signed_amount": np.where(is_income, amounts, -amounts),
+        }
+        for name, value in values.items():
+            if copy:
+                if np.array_equal(columns[name][rows], value):
+                    continue
+                columns[name] = columns[name].copy()
+            columns[name][rows] = value
+    
+    def _build_frame(self, columns: dict, size: int, alive: np.ndarray = None) -> "pd.DataFrame":
+        """Кадр по первым size строкам колонок кэша; индекс - позиции строк в хранилище.
+        Без маски alive колонки не копируются (кроме кодов категорий): строки, попавшие
+        в выданный кадр, потом не переписываются - правки идут в копию колонки, новые строки - за его конец"""
+        import pandas as pd
+        if alive is None:
+            index = pd.RangeIndex(size)
+            columns = {name: column[:size] for name, column in columns.items()}
+        else:
+            # Маска применяется к массивам numpy - это в разы быстрее отбора строк готового кадра
+            alive = alive[:size]
+            index = pd.Index(np.flatnonzero(alive))
+            columns = {name: column[:size][alive] for name, column in columns.items()}
+        return pd.DataFrame({
+            "amount": columns["amount"],
+            "category": pd.Categorical.from_codes(
+                columns["category"], categories=[cat.name for cat in self.store.categories]
+            ),
+            "date": columns["date"],
+            # Явный object: иначе pandas 3 заново выводит строковый тип по всей колонке при каждой сборке
+            "description": pd.Series(columns["description"], index=index, dtype=object, copy=False),
+            "type": pd.Categorical.from_codes(columns["type"], categories=["expense", "income"]),
+            "signed_amount": columns["signed_amount"]
+        }, index=index, copy=False)
+    
+    def query(self, **conditions) -> np.ndarray:
+        """Позиции живых транзакций в порядке времени, подходящих под условия (см. make_query):
+        user.query(start=..., categories=["Кафе"], type_="expense", text="такси").
+        Строки берутся через store[позиция]; массив общий для всех вызывающих - менять нельзя"""
+        return self.select(make_query(**conditions))
+    
+    def select(self, query: Query) -> np.ndarray:
+        return self._memo(query, lambda: select_rows(self.store, query))
+    
+    def aggregate(self, by: str = "category", **conditions) -> dict:
+        """Суммы и число транзакций по группам ('category', 'type', 'day', 'month')
+        среди подходящих под условия: {ключ: (сумма, количество)}"""
+        query = make_query(**conditions)
+        return self._memo((by, query), lambda: aggregate_rows(self.store, self.select(query), by))
+    
+    def _memo(self, key, compute):
+        """Результат запроса из кэша; кэш сбрасывается при любом изменении истории"""
+        with self.lock:
+            if self._queries_version != self.store.version:
+                self._queries.clear()
+                self._queries_version = self.store.version
+            result = self._queries.get(key)
+            if result is not None:
+                self._queries.move_to_end(key)
+                return result
+            result = compute()
+            if isinstance(result, np.ndarray):
+                result.flags.writeable = False
+            self._queries[key] = result
+            if len(self._queries) > QUERY_CACHE_SIZE:
+                self._queries.popitem(last=False)
+            return result
     
     def get_financial_summary(self) -> dict:
-        """Возвращает финансовую сводку используя Pandas"""
-        df = self.get_transactions_dataframe()
-        
-        if df.empty:
-            return {"total_income": 0, "total_expense": 0, "balance": 0}
-        
-        income = df[df['type'] == 'income']['amount'].sum()
-        expense = df[df['type'] == 'expense']['amount'].sum()
-        
-        return {
-            "total_income": income,
-            "total_expense": expense,
-            "balance": income - expense
-        }
+        """Возвращает финансовую сводку по накопленным итогам, без прохода по истории"""
+        return self.totals.summary()
     
     def save_data(self):
-        from services.data_manager import DataManager
-        data_manager = DataManager()
-        data_manager.save_user(self)
\ No newline at end of file
+        from services.data_manager import get_data_manager
+        get_data_manager().save_user(self)
\ No newline at end of file
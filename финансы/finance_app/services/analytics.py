@@ -1,128 +1,225 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 from models.user import User
+from models.transaction_store import to_timestamp
+from models.rollup import DAY_US, day_to_month, month_start_day
+from models.query import make_query
 from typing import List, Dict
-import tkinter as tk
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from services.instrumentation import timed
+from services.result_cache import ResultCache
+from services.tips import run_rules
+
+# Тренды: сколько месяцев показывать и окна скользящих средних (дней)
+TREND_MONTHS = 12
+SHORT_WINDOW = 30
+LONG_WINDOW = 90
 
 class AnalyticsService:
-    def __init__(self, user: User):
+    def __init__(self, user: User, data_manager=None, saver=None, cache: ResultCache = None):
         self.user = user
+        # Если хранилище умеет запросы (SQLite), фильтр по периоду выполняется на его стороне
+        self.data_manager = data_manager
+        # Фоновый писатель (BackgroundSaver): пока он не записал изменения, база отстает от памяти
+        self.saver = saver
+        # Результаты для текущей версии данных пользователя
+        self.cache = cache if cache is not None else ResultCache()
+        # Время правил и агрегатов советов при последнем расчете: {"rule.имя" | "aggregate.имя": секунды}
+        self.tip_timings = {}
     
-    def get_spending_by_category(self, period: str = 'month') -> pd.Series:
-        """Анализ расходов по категориям с использованием Pandas"""
-        df = self.user.get_transactions_dataframe()
-        
-        if df.empty:
-            return pd.Series()
-        
-        # Фильтрация по периоду
-        now = datetime.now()
-        if period == 'month':
-            start_date = now - timedelta(days=30)
-        elif period == 'week':
-            start_date = now - timedelta(days=7)
+    def _cached(self, key, compute):
+        return self.cache.get_or_compute(self.user.version, key, compute)
+    
+    @timed("analytics.get_spending_by_category")
+    def get_spending_by_category(self, period: str = 'month', start_date=None, end_date=None,
+                                 now: datetime = None) -> pd.Series:
+        """Расходы по категориям за период до now (или за [start_date, end_date), если они заданы).
+        Результат кэшируется до изменения транзакций - изменять его нельзя"""
+        if start_date is None and end_date is None:
+            start_date, end_date = self._period_bounds(period, now)
+        # Свертка считает целыми днями - хранилище получает те же границы
+        start_date, end_date = self._day_bounds(start_date, end_date)
+        with self.user.lock:
+            return self._cached(("spending", start_date, end_date),
+                                lambda: self._spending_by_category(start_date, end_date))
+    
+    def _spending_by_category(self, start_date, end_date) -> pd.Series:
+        storage = self._query_storage()
+        if storage is not None:
+            # Фильтр и группировка выполняются хранилищем без загрузки всей истории
+            totals = storage.category_totals(self.user.username, 'expense', start_date, end_date)
         else:
-            start_date = df['date'].min()
-        
-        filtered_df = df[df['date'] >= start_date]
-        expense_df = filtered_df[filtered_df['type'] == 'expense']
+            totals = self._category_totals('expense', start_date, end_date)
         
-        if expense_df.empty:
+        if not totals:
             return pd.Series()
         
-        return expense_df.groupby('category')['amount'].sum()
+        return pd.Series(totals, name='amount').rename_axis('category').sort_index()
     
-    def get_income_vs_expense(self) -> Dict[str, float]:
+    @timed("analytics.get_income_vs_expense")
+    def get_income_vs_expense(self, period: str = 'all', now: datetime = None) -> Dict[str, float]:
         """Сравнение доходов и расходов"""
-        df = self.user.get_transactions_dataframe()
+        start_date, end_date = self._period_bounds(period, now)
         
-        if df.empty:
-            return {"income": 0, "expense": 0}
-        
-        income = df[df['type'] == 'income']['amount'].sum()
-        expense = df[df['type'] == 'expense']['amount'].sum()
-        
-        return {"income": income, "expense": expense}
+        def compute():
+            income = sum(self._category_totals('income', start_date, end_date).values())
+            expense = sum(self._category_totals('expense', start_date, end_date).values())
+            return {"income": income, "expense": expense}
+        return self._cached(("income_vs_expense", start_date, end_date), compute)
     
-    def create_pie_chart(self, parent, period: str = 'month'):
-        """Создает круговую диаграмму расходов в Tkinter"""
-        spending_data = self.get_spending_by_category(period)
-        
-        if spending_data.empty:
-            # Создаем пустой график если нет данных
-            fig, ax = plt.subplots(figsize=(6, 4))
-            ax.text(0.5, 0.5, 'Нет данных о расходах', 
-                   horizontalalignment='center', verticalalignment='center',
-                   transform=ax.transAxes, fontsize=12)
-            ax.set_title('Расходы по категориям')
-        else:
-            fig, ax = plt.subplots(figsize=(6, 4))
-            colors = ['#e74c3c', '#e67e22', '#f39c12', '#d35400', '#c0392b', '#8e44ad']
-            
-            wedges, texts, autotexts = ax.pie(
-                spending_data.values, 
-                labels=spending_data.index,
-                autopct='%1.1f%%',
-                colors=colors[:len(spending_data)]
-            )
-            
-            ax.set_title(f'Расходы по категориям ({period})')
-        
-        canvas = FigureCanvasTkAgg(fig, parent)
-        canvas.draw()
-        return canvas.get_tk_widget()
+    @timed("analytics.aggregate")
+    def aggregate(self, by: str = 'category', **conditions) -> dict:
+        """Группировка выборки (условия как в User.query); в SQLite - одним запросом к базе"""
+        with self.user.lock:
+            storage = self._query_storage()
+            if storage is not None:
+                return storage.aggregate(self.user.username, make_query(**conditions), by)
+            return self.user.aggregate(by, **conditions)
     
-    def create_income_expense_chart(self, parent):
-        """Создает столбчатую диаграмму доходов vs расходов"""
-        data = self.get_income_vs_expense()
-        
-        fig, ax = plt.subplots(figsize=(6, 4))
-        
-        categories = ['Доходы', 'Расходы']
-        values = [data['income'], data['expense']]
-        colors = ['#2ecc71', '#e74c3c']
-        
-        bars = ax.bar(categories, values, color=colors, alpha=0.7)
-        ax.set_title('Доходы vs Расходы')
-        ax.set_ylabel('Сумма (руб)')
-        
-        # Добавляем подписи значений
-        for bar, value in zip(bars, values):
-            ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + max(values)*0.01,
-                   f'{value:.2f}', ha='center', va='bottom')
-        
-        canvas = FigureCanvasTkAgg(fig, parent)
-        canvas.draw()
-        return canvas.get_tk_widget()
+    def _query_storage(self):
+        """Хранилище для запросов на его стороне или None, если считать нужно по памяти:
+        хранилище не умеет запросы или в нем еще нет всех изменений пользователя.
+        Вызывается под user.lock"""
+        if not (self.data_manager and self.data_manager.storage.supports_queries):
+            return None
+        if self.saver is not None and not self.saver.is_saved(self.user):
+            return None
+        return self.data_manager.storage
+    
+    @timed("analytics.category_totals")
+    def _category_totals(self, type_: str, start_date=None, end_date=None) -> dict:
+        """Суммы по категориям из дневных/месячных корзин User.rollup (с точностью до дня)"""
+        start_day = to_timestamp(start_date) // DAY_US if start_date else None
+        # Неполный последний день включается целиком
+        end_day = -(-to_timestamp(end_date) // DAY_US) if end_date else None
+        categories = self.user.store.categories
+        return {
+            categories[code].name: amount
+            for code, (amount, count) in self.user.rollup.totals(start_day, end_day).items()
+            if count and categories[code].type == type_
+        }
+    
+    @staticmethod
+    def _period_bounds(period: str, now: datetime = None):
+        """Границы периода из комбобокса: 'week', 'month' или 'all'.
+        Начало - полночь: корзины свертки дневные, а результат не меняется в течение дня"""
+        today = AnalyticsService._today(now)
+        if period == 'month':
+            return today - timedelta(days=30), None
+        if period == 'week':
+            return today - timedelta(days=7), None
+        return None, None
+    
+    @staticmethod
+    def _day_bounds(start_date, end_date):
+        """Границы [start_date, end_date), выровненные по дням, как в _category_totals:
+        начало - полночь своего дня, неполный последний день включается целиком"""
+        if start_date is not None:
+            start_date = AnalyticsService._today(start_date)
+        if end_date is not None and end_date != AnalyticsService._today(end_date):
+            end_date = AnalyticsService._today(end_date) + timedelta(days=1)
+        return start_date, end_date
+    
+    @staticmethod
+    def _today(now: datetime = None) -> datetime:
+        now = now or datetime.now()
+        return datetime(now.year, now.month, now.day)
+    
+    def _day_key(self, now: datetime = None) -> tuple:
+        """Часть ключа для результатов, зависящих от текущего дня и бюджетов"""
+        return (self._today(now), self.user.budget_tracker.version)
     
-    def generate_economy_tips(self) -> List[str]:
+    @timed("analytics.compute_report")
+    def compute_report(self, period: str = 'month', now: datetime = None) -> dict:
+        """Все данные вкладки отчетов разом; безопасно вызывать из фонового потока.
+        Текущее время берется один раз - у обеих диаграмм и советов одно и то же окно.
+        Под замком пользователя снимается копия данных, сам расчет идет по ней без замка"""
+        now = now or datetime.now()
+        with self.user.lock:
+            key = ("report", period) + self._day_key(now)
+            report = self.cache.get(self.user.version, key)
+            if report is not None:
+                return report
+            # Запрос к хранилищу - пока база заведомо совпадает с памятью (см. _query_storage)
+            self.get_spending_by_category(period, now=now)
+            snapshot = self.user.snapshot()
+        # Кэш общий: версия копии равна версии пользователя на момент снимка
+        analytics = AnalyticsService(snapshot, cache=self.cache)
+        report = analytics._cached(key, lambda: {
+            "period": period,
+            "spending": analytics.get_spending_by_category(period, now=now),
+            "income_vs_expense": analytics.get_income_vs_expense(now=now),
+            "trends": analytics.get_trends(now),
+            "tips": analytics.generate_economy_tips(now)
+        })
+        if analytics.tip_timings:
+            self.tip_timings = analytics.tip_timings
+        return report
+    
+    @timed("analytics.get_trends")
+    def get_trends(self, now: datetime = None) -> dict:
+        """Тренды за TREND_MONTHS месяцев по дневным корзинам User.rollup, без прохода по транзакциям:
+        скользящие средние расходов в день, помесячные итоги и прогноз баланса на конец месяца"""
+        now = now or datetime.now()
+        today = self._today(now)
+        return self._cached(("trends", today), lambda: self._trends(today))
+    
+    def _trends(self, today: datetime) -> dict:
+        store = self.user.store
+        today_day = to_timestamp(today) // DAY_US
+        current_month = day_to_month(today_day)
+        first_day = month_start_day(current_month - TREND_MONTHS + 1)
+        # Дни до первого показанного нужны, чтобы длинное окно было полным с первого дня
+        start_day = first_day - LONG_WINDOW + 1
+        matrix = self.user.rollup.daily_matrix(start_day, today_day + 1, len(store.categories))
+        dates = pd.DatetimeIndex(np.arange(start_day, today_day + 1).astype("datetime64[D]"))
+        daily = pd.DataFrame(matrix, index=dates, columns=[cat.name for cat in store.categories])
+        income_columns = [cat.name for cat in store.categories if cat.type == 'income']
+        expense = daily.drop(columns=income_columns)
+        
+        shown = len(daily) - (today_day - first_day + 1)
+        by_category_short = expense.rolling(SHORT_WINDOW).mean().iloc[shown:]
+        by_category_long = expense.rolling(LONG_WINDOW).mean().iloc[shown:]
+        monthly = pd.DataFrame({
+            "income": daily[income_columns].sum(axis=1),
+            "expense": expense.sum(axis=1)
+        }).iloc[shown:].resample("MS").sum()
+        monthly["net"] = monthly["income"] - monthly["expense"]
+        monthly["expense_change"] = monthly["expense"].pct_change()
+        
+        # Прогноз: доход - как в среднем за три прошлых месяца (если еще не пришел),
+        # расход - по среднему за последние SHORT_WINDOW дней на каждый оставшийся день
+        month_income, month_expense = monthly["income"].iloc[-1], monthly["expense"].iloc[-1]
+        usual_income = monthly["income"].iloc[-4:-1].mean()
+        remaining_days = month_start_day(current_month + 1) - today_day - 1
+        daily_expense = by_category_short.iloc[-1].sum()
+        balance = self.user.get_financial_summary()['balance']
+        projected = balance + max(0.0, usual_income - month_income) - daily_expense * remaining_days
+        return {
+            "short_window": SHORT_WINDOW,
+            "long_window": LONG_WINDOW,
+            "by_category_short": by_category_short,
+            "by_category_long": by_category_long,
+            "expense_short": by_category_short.sum(axis=1),
+            "expense_long": by_category_long.sum(axis=1),
+            "monthly": monthly,
+            "forecast": {
+                "balance": balance,
+                "month_income": float(month_income),
+                "month_expense": float(month_expense),
+                "remaining_days": remaining_days,
+                "projected_balance": float(projected)
+            }
+        }
+    
+    @timed("analytics.generate_economy_tips")
+    def generate_economy_tips(self, now: datetime = None) -> List[str]:
         """Генерирует советы по экономии на основе анализа данных"""
-        tips = []
-        summary = self.user.get_financial_summary()
-        spending = self.get_spending_by_category()
-        
-        # Анализ с использованием Pandas
-        df = self.user.get_transactions_dataframe()
-        
-        if not df.empty:
-            # Анализ баланса
-            if summary['balance'] < 0:
-                tips.append("🚨 Внимание! Ваши расходы превышают доходы. Срочно пересмотрите бюджет!")
-            
-            # Анализ крупнейших категорий расходов
-            if not spending.empty:
-                max_spending = spending.nlargest(2)
-                for category, amount in max_spending.items():
-                    tips.append(f"💰 Самые большие расходы: {category} - {amount:.2f} руб.")
-            
-            # Анализ регулярности доходов
-            income_dates = df[df['type'] == 'income']['date']
-            if len(income_dates) > 1:
-                date_diff = (income_dates.max() - income_dates.min()).days
-                if date_diff > 60 and len(income_dates) < 3:
-                    tips.append("💡 Рекомендуем найти дополнительные источники дохода")
+        now = now or datetime.now()
+        return self._cached(("tips",) + self._day_key(now), lambda: self._economy_tips(now))
+    
+    def _economy_tips(self, now: datetime) -> List[str]:
+        tips, self.tip_timings = run_rules(self, now)
         
         # Общие советы
         if not tips:
@@ -132,9 +229,8 @@ class AnalyticsService:
                 "💡 Совет: Планируйте бюджет на месяц вперед"
             ])
         else:
-            tips.extend([
-                "💡 Совет: Ведите учет всех ежедневных расходов",
-                "💡 Совет: Установите лимиты по категориям расходов"
-            ])
+            tips.append("💡 Совет: Ведите учет всех ежедневных расходов")
+            if not self.user.budgets:
+                tips.append("💡 Совет: Установите лимиты по категориям расходов на вкладке «Бюджеты»")
         
         return tips
\ No newline at end of file
@@ -0,0 +1,138 @@
+import threading
+import time
+from services.data_manager import get_data_manager
+
+# Сколько секунд копить изменения перед записью, чтобы объединить их в одну
+GROUP_COMMIT_DELAY = 0.2
+
+class BackgroundSaver:
+    """Фоновая запись пользователей: интерфейс только ставит изменения в очередь,
+    а поток объединяет быстрые правки одного пользователя в одну запись на диск"""
+    
+    def __init__(self, data_manager, delay: float = GROUP_COMMIT_DELAY):
+        self.data_manager = data_manager
+        self.delay = delay
+        self._cond = threading.Condition()
+        # Имя пользователя -> {"user": User, "changes": [(вид, данные), ...], "full": bool}
+        self._pending = {}
+        # Не записанные из-за ошибки изменения: повторяются при следующей записи или flush()
+        self._failed = {}
+        self._errors = []
+        self._busy = False
+        # Имена пользователей из пачки, которая записывается прямо сейчас
+        self._writing = set()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="BackgroundSaver", daemon=True)
+        self._thread.start()
+    
+    def append_transaction(self, user, transaction):
+        """Ставит в очередь дозапись одной транзакции"""
+        self.queue_change(user, ("add", transaction))
+    
+    def update_transaction(self, user, transaction):
+        self.queue_change(user, ("edit", transaction))
+    
+    def delete_transaction(self, user, transaction_id: int):
+        self.queue_change(user, ("delete", transaction_id))
+    
+    def save_budgets(self, user):
+        """Ставит в очередь запись текущих бюджетов пользователя (копия берется сейчас)"""
+        with user.lock:
+            budgets = {category: dict(budget) for category, budget in user.budgets.items()}
+        self.queue_change(user, ("budgets", budgets))
+    
+    def queue_change(self, user, change):
+        """Ставит в очередь изменение ("add" | "edit" | "delete" | "budgets", данные) - например, результат User.undo()"""
+        with self._cond:
+            self._entry(user)["changes"].append(change)
+            self._cond.notify()
+    
+    def save_user(self, user):
+        """Ставит в очередь полную запись пользователя"""
+        with self._cond:
+            self._entry(user)["full"] = True
+            self._cond.notify()
+    
+    def flush(self, timeout: float = None) -> bool:
+        """Дожидается записи всей очереди; True, если все записано без ошибок"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._retry_failed()
+            self._cond.notify_all()
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return not self._failed
+    
+    def is_saved(self, user) -> bool:
+        """True, если у пользователя нет изменений в очереди, в записи или среди неудавшихся.
+        Интерфейс меняет историю и ставит изменение в очередь под user.lock, поэтому
+        под этим же замком ответ значит, что хранилище совпадает с памятью"""
+        with self._cond:
+            return all(user.username not in names for names in (self._pending, self._writing, self._failed))
+    
+    def pop_errors(self) -> list:
+        """Забирает накопленные сообщения об ошибках записи (вызывается из потока Tk)"""
+        with self._cond:
+            errors, self._errors = self._errors, []
+        return errors
+    
+    def stop(self, timeout: float = None):
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+    
+    def _entry(self, user):
+        self._retry_failed()
+        return self._pending.setdefault(
+            user.username, {"user": user, "changes": [], "full": False}
+        )
+    
+    def _retry_failed(self):
+        for username, failed in self._failed.items():
+            entry = self._pending.setdefault(username, {"user": failed["user"], "changes": [], "full": False})
+            entry["changes"][:0] = failed["changes"]
+            entry["full"] = entry["full"] or failed["full"]
+        self._failed = {}
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping and not self._pending:
+                    return
+            # Даем накопиться соседним изменениям - они уйдут на диск одной записью
+            time.sleep(self.delay)
+            with self._cond:
+                batch, self._pending = self._pending, {}
+                self._busy = True
+                self._writing = set(batch)
+            failed = {}
+            for username, entry in batch.items():
+                if entry["full"]:
+                    ok = self.data_manager.save_user(entry["user"])
+                else:
+                    ok = self.data_manager.apply_changes(entry["user"], entry["changes"])
+                if not ok:
+                    failed[username] = entry
+            with self._cond:
+                self._busy = False
+                self._writing = set()
+                for username, entry in failed.items():
+                    self._failed[username] = entry
+                    self._errors.append(f"Не удалось сохранить данные пользователя {username}")
+                self._cond.notify_all()
+
+_shared_saver = None
+
+def get_background_saver() -> BackgroundSaver:
+    """Общий для процесса фоновый писатель поверх get_data_manager()"""
+    global _shared_saver
+    if _shared_saver is None:
+        _shared_saver = BackgroundSaver(get_data_manager())
+    return _shared_saver
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""Пакетные отчеты по всем пользователям хранилища без окна: графики рисуются
+на холсте Agg и вместе с советами сохраняются в PNG, HTML и PDF.
+
+Запуск из папки finance_app:
+    python -m services.batch_reports --output reports --formats png,html,pdf --workers 4
+
+Пользователи читаются из хранилища по одному и раздаются пулу процессов
+(services.process_pool): в очереди пула не больше QUEUE_PER_WORKER пользователей
+на процесс. Для раздельных хранилищ (шарды, SQLite) память не растет с числом
+пользователей; общий JSON-файл разбирается целиком (см. JsonStorage.iter_user_data).
+"""
+import argparse
+import base64
+import html
+import io
+import os
+import re
+import sys
+import textwrap
+import time
+import unicodedata
+from datetime import datetime
+from services.process_pool import run_bounded
+from services.storage import open_storage
+
+FORMATS = ("png", "html", "pdf")
+
+class _Worker:
+    """Состояние процесса пула: DataManager и графики создаются один раз
+    и переиспользуются для всех пользователей этого процесса"""
+    
+    def __init__(self, backend, output_dir, formats, period, now):
+        from services.data_manager import DataManager
+        from ui.charts import SpendingPieChart, IncomeExpenseChart
+        self.data_manager = DataManager(open_storage(backend))
+        self.pie_chart = SpendingPieChart()
+        self.bar_chart = IncomeExpenseChart()
+        self.pie_chart.auto_redraw = self.bar_chart.auto_redraw = False
+        self.output_dir = output_dir
+        self.formats = formats
+        self.period = period
+        self.now = now
+    
+    def render(self, user_data) -> list:
+        """Строит отчет одного пользователя и возвращает пути записанных файлов"""
+        from services.analytics import AnalyticsService
+        user = self.data_manager.user_from_data(user_data)
+        report = AnalyticsService(user).compute_report(self.period, self.now)
+        self.pie_chart.update(report["spending"], report["period"])
+        self.bar_chart.update(report["income_vs_expense"])
+        
+        base = os.path.join(self.output_dir, safe_filename(user.username))
+        written = []
+        if "png" in self.formats or "html" in self.formats:
+            # Каждая картинка рендерится один раз - для файла и для HTML
+            images = {
+                "spending": _png_bytes(self.pie_chart.figure),
+                "income": _png_bytes(self.bar_chart.figure)
+            }
+            if "png" in self.formats:
+                for name, data in images.items():
+                    written.append(_write(f"{base}_{name}.png", data))
+            if "html" in self.formats:
+                written.append(_write(f"{base}.html", _html_report(user.username, images, report["tips"]).encode("utf-8")))
+        if "pdf" in self.formats:
+            written.append(self._write_pdf(f"{base}.pdf", user.username, report["tips"]))
+        return written
+    
+    def _write_pdf(self, path, username, tips):
+        from matplotlib.backends.backend_pdf import PdfPages
+        from matplotlib.figure import Figure
+        tips_page = Figure(figsize=(8.27, 11.69))
+        lines = [f"Советы по экономии: {username}", ""]
+        for tip in tips:
+            lines.extend(textwrap.wrap(f"• {_plain(tip)}", 90))
+        tips_page.text(0.05, 0.95, "\n".join(lines), va="top", fontsize=10)
+        with PdfPages(path) as pdf:
+            pdf.savefig(self.pie_chart.figure)
+            pdf.savefig(self.bar_chart.figure)
+            pdf.savefig(tips_page)
+        return path
+
+def safe_filename(username: str) -> str:
+    """Имя файла из логина: все, кроме букв, цифр, точки и дефиса, заменяется на _"""
+    return re.sub(r"[^\w.-]", "_", username) or "_"
+
+def _png_bytes(figure) -> bytes:
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+def _write(path, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+def _plain(text: str) -> str:
+    # В шрифтах matplotlib нет эмодзи - в PDF они убираются
+    return "".join(ch for ch in text if unicodedata.category(ch) != "So").strip()
+
+def _html_report(username, images, tips) -> str:
+    pictures = "\n".join(
+        f'<img src="data:image/png;base64,{base64.b64encode(data).decode("ascii")}" alt="{name}">'
+        for name, data in images.items()
+    )
+    items = "\n".join(f"<li>{html.escape(tip)}</li>" for tip in tips)
+    return (
+        "<!DOCTYPE html>\n<html lang=\"ru\">\n<head><meta charset=\"utf-8\">"
+        f"<title>Отчет: {html.escape(username)}</title></head>\n<body>\n"
+        f"<h1>Отчет: {html.escape(username)}</h1>\n{pictures}\n"
+        f"<h2>Советы по экономии</h2>\n<ul>\n{items}\n</ul>\n</body>\n</html>\n"
+    )
+
+def generate_reports(backend: str = None, output_dir: str = "reports", formats=FORMATS,
+                     period: str = "month", workers: int = None):
+    """Отчеты для всех пользователей хранилища; возвращает (готово, с ошибками)"""
+    os.makedirs(output_dir, exist_ok=True)
+    storage = open_storage(backend)
+    # Одно окно периода для всех пользователей пакета
+    now = datetime.now()
+    done = failed = 0
+    
+    def on_result(username, written):
+        nonlocal done
+        done += 1
+    
+    def on_error(username, e):
+        nonlocal failed
+        print(f"Ошибка: {username}: {e}")
+        failed += 1
+    
+    tasks = ((user_data["username"], (user_data,)) for user_data in storage.iter_user_data())
+    run_bounded(_Worker, (backend, output_dir, tuple(formats), period, now), "render",
+                tasks, on_result, on_error, workers)
+    
+    close = getattr(storage, "close", None)
+    if close:
+        close()
+    return done, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Отчеты по всем пользователям без окна")
+    parser.add_argument("--output", default="reports", help="папка для отчетов")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="png, html, pdf через запятую")
+    parser.add_argument("--period", default="month", choices=["week", "month", "all"])
+    parser.add_argument("--backend", default=None, choices=["json", "sqlite", "sharded"],
+                        help="по умолчанию из FINANCE_STORAGE")
+    parser.add_argument("--workers", type=int, default=None, help="процессов (по умолчанию по числу ядер)")
+    args = parser.parse_args(argv)
+    
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"неизвестные форматы: {', '.join(sorted(unknown))}")
+    
+    start = time.perf_counter()
+    done, failed = generate_reports(args.backend, args.output, formats, args.period, args.workers)
+    seconds = time.perf_counter() - start
+    print(f"Отчетов: {done}, ошибок: {failed}, {seconds:.1f} с "
+          f"({done / seconds if seconds else 0:.1f} пользователей/с)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -1,65 +1,198 @@
-import json
-import os
+import threading
+import numpy as np
+from collections import OrderedDict
 from models.user import User
-from models.transaction import Transaction
 from models.category import CategoryManager
+from models.transaction_store import columns_to_dicts
+from services.storage import open_storage
+from services.instrumentation import timed
+
+# Сколько пользователей держится в памяти одновременно
+MAX_CACHED_USERS = 32
 
 class DataManager:
-    def __init__(self):
-        self.data_file = "finance_data.json"
+    def __init__(self, storage=None, max_cached_users: int = MAX_CACHED_USERS):
+        self.storage = storage if storage else open_storage()
         self.category_manager = CategoryManager()
+        # LRU-кэш загруженных пользователей: имя -> (отпечаток хранилища, User)
+        self.max_cached_users = max_cached_users
+        self._cache = OrderedDict()
+        # Кэш используется и потоком интерфейса, и фоновой записью
+        self._cache_lock = threading.RLock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
     
     def load_users(self):
-        if not os.path.exists(self.data_file):
-            return {}
-        try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {}
+        return self.storage.load_all()
     
+    @timed("data_manager.save_user")
     def save_user(self, user):
         try:
-            users_data = self.load_users()
-            
-            user_data = {
-                "username": user.username,
-                "transactions": [t.to_dict() for t in user.transactions],
-                "budgets": user.budgets
-            }
+            with user.lock:
+                user_data = {
+                    "username": user.username,
+                    "transactions": [t.to_dict() for t in user.transactions],
+                    "budgets": dict(user.budgets)
+                }
             
-            users_data[user.username] = user_data
-            
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(users_data, f, ensure_ascii=False, indent=2)
+            self.storage.save_user_data(user_data)
+            self._remember(user)
             
             return True
         except Exception as e:
             print(f"Ошибка: {e}")
             return False
     
+    def append_transaction(self, user, transaction):
+        """Дописывает одну транзакцию, не перезаписывая остальные данные"""
+        return self.append_transactions(user, [transaction])
+    
+    @timed("data_manager.append_transactions")
+    def append_transactions(self, user, transactions):
+        """Дописывает транзакции в хранилище одной операцией (принимает и генератор)"""
+        try:
+            self.storage.append_transactions(user.username, (t.to_dict() for t in transactions))
+            self._remember(user)
+            return True
+        except Exception as e:
+            print(f"Ошибка: {e}")
+            return False
+    
+    @timed("data_manager.apply_changes")
+    def apply_changes(self, user, changes: list):
+        """Записывает изменения по порядку: ("add", Transaction), ("edit", Transaction), ("delete", id),
+        ("budgets", словарь бюджетов).
+        Подряд идущие добавления уходят одной дозаписью. Записанные изменения
+        удаляются из списка, так что после ошибки в нем остается только незаписанное"""
+        try:
+            while changes:
+                kind, payload = changes[0]
+                if kind == "add":
+                    count = next((i for i, change in enumerate(changes) if change[0] != "add"), len(changes))
+                    self.storage.append_transactions(user.username, [t.to_dict() for _, t in changes[:count]])
+                elif kind == "edit":
+                    count = 1
+                    self.storage.update_transaction(user.username, payload.to_dict())
+                elif kind == "budgets":
+                    count = 1
+                    self.storage.save_budgets(user.username, payload)
+                else:
+                    count = 1
+                    self.storage.delete_transaction(user.username, payload)
+                del changes[:count]
+            self._remember(user)
+            return True
+        except Exception as e:
+            print(f"Ошибка: {e}")
+            return False
+    
+    @timed("data_manager.append_columns")
+    def append_columns(self, user, ids, amounts, timestamps, category_codes, descriptions):
+        """Дописывает в хранилище строки из готовых колонок (массовый импорт) до того,
+        как они попадут в память пользователя; коды - из user.store.category_code"""
+        try:
+            rows = columns_to_dicts(user.store.categories, ids, amounts, timestamps, category_codes, descriptions)
+            self.storage.append_transactions(user.username, rows)
+            self._remember(user)
+            return True
+        except Exception as e:
+            print(f"Ошибка: {e}")
+            return False
+    
+    def compact(self):
+        self.storage.compact()
+    
+    @timed("data_manager.load_user")
     def load_user(self, username):
-        users_data = self.load_users()
-        if username not in users_data:
+        user = self._cached(username)
+        if user is not None:
+            return user
+        
+        user_data = self.storage.load_user_data(username)
+        if user_data is None:
             return None
         
-        user_data = users_data[username]
-        user = User(username)
+        user = self.user_from_data(user_data)
+        self._remember(user)
+        return user
+    
+    @timed("data_manager.user_from_data")
+    def user_from_data(self, user_data):
+        """Собирает User из словаря в формате хранилища"""
+        user = User(user_data["username"])
         
+        # Колонки собираются целиком и добавляются в хранилище одним вызовом
+        amounts, dates, codes, descriptions, ids = [], [], [], [], []
         for t_data in user_data.get("transactions", []):
             category = self.category_manager.get_category_by_name(t_data["category"])
             if category:
-                from datetime import datetime
-                transaction = Transaction(
-                    amount=float(t_data["amount"]),
-                    category=category,
-                    date=datetime.fromisoformat(t_data["date"]),
-                    description=t_data.get("description", "")
-                )
-                user.add_transaction(transaction)
+                amounts.append(float(t_data["amount"]))
+                dates.append(t_data["date"])
+                codes.append(user.store.category_code(category))
+                descriptions.append(t_data.get("description", ""))
+                ids.append(t_data["id"])
+        if amounts:
+            timestamps = np.array(dates, dtype="datetime64[us]").view(np.int64)
+            ids = np.array(ids, dtype=np.int64)
+            if np.any(np.diff(ids) <= 0):
+                # Хранилища отдают строки по возрастанию id; иначе упорядочиваем сами
+                order = np.argsort(ids, kind="stable")
+                amounts, codes = np.asarray(amounts)[order], np.asarray(codes)[order]
+                timestamps, ids = timestamps[order], ids[order]
+                descriptions = [descriptions[i] for i in order.tolist()]
+            user.extend_columns(amounts, timestamps, codes, descriptions, ids)
         
         user.budgets = user_data.get("budgets", {})
         return user
     
     def user_exists(self, username):
-        return username in self.load_users()
\ No newline at end of file
+        if self._cached(username) is not None:
+            return True
+        return self.storage.user_exists(username)
+    
+    def invalidate(self, username=None):
+        """Сбрасывает кэш одного пользователя или весь кэш"""
+        with self._cache_lock:
+            if username is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(username, None)
+    
+    def cache_stats(self) -> dict:
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "evictions": self.cache_evictions,
+            "size": len(self._cache)
+        }
+    
+    def _cached(self, username):
+        """Возвращает пользователя из кэша, если данные в хранилище с тех пор не менялись"""
+        with self._cache_lock:
+            entry = self._cache.get(username)
+            if entry is not None and entry[0] is not None and entry[0] == self.storage.signature(username):
+                self._cache.move_to_end(username)
+                self.cache_hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._cache[username]
+            self.cache_misses += 1
+            return None
+    
+    def _remember(self, user):
+        with self._cache_lock:
+            self._cache[user.username] = (self.storage.signature(user.username), user)
+            self._cache.move_to_end(user.username)
+            while len(self._cache) > self.max_cached_users:
+                self._cache.popitem(last=False)
+                self.cache_evictions += 1
+
+_shared_data_manager = None
+
+def get_data_manager() -> DataManager:
+    """Общий для всего процесса DataManager с кэшем пользователей"""
+    global _shared_data_manager
+    if _shared_data_manager is None:
+        _shared_data_manager = DataManager()
+    return _shared_data_manager
\ No newline at end of file
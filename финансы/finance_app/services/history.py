@@ -0,0 +1,123 @@
+import numpy as np
+from models.transaction_store import from_timestamp
+from models.query import Query, make_query
+
+class HistoryView:
+    """Отсортированное и отфильтрованное окно на историю пользователя.
+    Хранит только порядок позиций (int64 на строку); объекты и строки
+    для отображения создаются лишь для видимого окна через rows()"""
+    SORT_KEYS = ("date", "category", "amount")
+    
+    def __init__(self, user):
+        self.user = user
+        self.sort_key = "date"
+        self.descending = True
+        # Условия выборки (models.query.Query)
+        self.filters = Query()
+        # Ключ сортировки -> [порядок позиций, ключи в этом порядке, ключи по позициям,
+        #                     layout_version, учтено записей store.edited, число категорий]
+        self._indexes = {}
+        self._positions = None
+        self._positions_state = None
+    
+    def set_sort(self, key: str, descending: bool = None):
+        if key not in self.SORT_KEYS:
+            raise ValueError(f"Неизвестный ключ сортировки: {key}")
+        if descending is None:
+            # Повторный выбор того же столбца меняет направление
+            descending = not self.descending if key == self.sort_key else False
+        self.sort_key = key
+        self.descending = descending
+    
+    def set_filter(self, category: str = None, start=None, end=None,
+                   min_amount: float = None, max_amount: float = None):
+        """Фильтр по категории, датам [start, end) и сумме [min_amount, max_amount]"""
+        self.filters = make_query(start=start, end=end, categories=category,
+                                  min_amount=min_amount, max_amount=max_amount)
+    
+    def __len__(self):
+        return len(self.positions())
+    
+    def positions(self) -> np.ndarray:
+        """Позиции строк хранилища в порядке отображения"""
+        with self.user.lock:
+            store = self.user.store
+            state = (store.version, self.sort_key, self.descending, self.filters)
+            if self._positions_state != state:
+                order = self._sort_index(self.sort_key)
+                if self.filters != Query():
+                    mask = np.zeros(len(store), dtype=bool)
+                    mask[self.user.select(self.filters)] = True
+                    order = order[mask[order]]
+                elif store.deleted:
+                    # Надгробия остаются в индексе и отсекаются только здесь
+                    order = order[store.alive[order]]
+                self._positions = order[::-1] if self.descending else order
+                self._positions_state = state
+            return self._positions
+    
+    def rows(self, start: int, stop: int) -> list:
+        """Строки [start, stop) для таблицы: (позиция, (дата, категория, тип, сумма, описание))"""
+        with self.user.lock:
+            store = self.user.store
+            result = []
+            for position in self.positions()[start:stop].tolist():
+                category = store.categories[store.category_codes[position]]
+                result.append((position, (
+                    from_timestamp(store.timestamps[position]).strftime("%d.%m.%Y %H:%M"),
+                    category.name,
+                    "Доход" if category.type == "income" else "Расход",
+                    f"{store.amounts[position]:.2f}",
+                    store.descriptions[position]
+                )))
+            return result
+    
+    def _sort_values(self, key: str) -> np.ndarray:
+        store = self.user.store
+        if key == "amount":
+            return store.amounts
+        # Категории сортируются по имени: код -> ранг имени
+        names = [cat.name for cat in store.categories]
+        rank = np.empty(len(names), dtype=np.int64)
+        rank[np.argsort(names, kind="stable")] = np.arange(len(names))
+        return rank[store.category_codes]
+    
+    def _sort_index(self, key: str) -> np.ndarray:
+        """Индекс сортировки по возрастанию, включая удаленные строки.
+        Дозапись вливается в готовый индекс, правленая строка переносится, только если
+        ее ключ изменился; полная сортировка - лишь после сдвига позиций"""
+        store = self.user.store
+        if key == "date":
+            # Хранилище само поддерживает индекс времени
+            return store.time_order()
+        values = self._sort_values(key)
+        entry = self._indexes.get(key)
+        if (entry is None or entry[3] != store.layout_version
+                or entry[5] != len(store.categories) or len(entry[2]) > len(store)):
+            order = np.argsort(values, kind="stable")
+            entry = [order, values[order], values.copy(), store.layout_version, 0, len(store.categories)]
+        order, keys, by_position = entry[0], entry[1], entry[2]
+        count = len(by_position)
+        for position in dict.fromkeys(store.edited[entry[4]:]):
+            if position >= count or values[position] == by_position[position]:
+                continue
+            # Строка ищется среди строк с прежним ключом и переносится к новому
+            old = by_position[position]
+            lo = int(np.searchsorted(keys, old, side="left"))
+            hi = int(np.searchsorted(keys, old, side="right"))
+            slot = lo + int(np.flatnonzero(order[lo:hi] == position)[0])
+            order, keys = np.delete(order, slot), np.delete(keys, slot)
+            # Среди равных ключей порядок по позиции, как у устойчивой сортировки
+            lo = int(np.searchsorted(keys, values[position], side="left"))
+            hi = int(np.searchsorted(keys, values[position], side="right"))
+            at = lo + int(np.searchsorted(order[lo:hi], position))
+            order, keys = np.insert(order, at, position), np.insert(keys, at, values[position])
+            by_position[position] = values[position]
+        if count < len(store):
+            tail = np.arange(count, len(store))
+            tail = tail[np.argsort(values[tail], kind="stable")]
+            at = np.searchsorted(keys, values[tail], side="right")
+            order, keys = np.insert(order, at, tail), np.insert(keys, at, values[tail])
+            by_position = np.concatenate([by_position, values[count:]])
+        self._indexes[key] = [order, keys, by_position, store.layout_version, len(store.edited), len(store.categories)]
+        return order
\ No newline at end of file
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+# Поле транзакции -> заголовок колонки в CSV
+DEFAULT_COLUMNS = {
+    "date": "date",
+    "amount": "amount",
+    "category": "category",
+    "description": "description"
+}
+
+def row_hashes(timestamps, amounts, category_codes, descriptions) -> np.ndarray:
+    """Хэш строки для поиска дублей: дата, сумма до копеек, категория и описание"""
+    return pd.util.hash_pandas_object(pd.DataFrame({
+        "timestamp": np.asarray(timestamps, dtype=np.int64),
+        "amount": np.round(np.asarray(amounts, dtype=np.float64), 2),
+        "category": np.asarray(category_codes, dtype=np.int64),
+        "description": pd.Series(descriptions, dtype=object).fillna("").astype(str).values
+    }), index=False).values
+
+class StatementImporter:
+    """Массовый импорт банковской выписки CSV: файл читается кусками,
+    каждый кусок разбирается векторно, а в хранилище все уходит одной записью"""
+    
+    def __init__(self, data_manager, columns: dict = None, category_aliases: dict = None,
+                 date_format: str = None, dayfirst: bool = False, sep: str = ",",
+                 decimal: str = ".", encoding: str = "utf-8", chunksize: int = 100_000):
+        self.data_manager = data_manager
+        self.columns = dict(DEFAULT_COLUMNS, **(columns or {}))
+        # Названия категорий банка -> названия из CategoryManager
+        self.category_aliases = category_aliases or {}
+        self.date_format = date_format
+        self.dayfirst = dayfirst
+        self.sep = sep
+        self.decimal = decimal
+        self.encoding = encoding
+        self.chunksize = chunksize
+    
+    def import_file(self, user, path: str) -> dict:
+        """Импортирует файл в историю пользователя; возвращает статистику по строкам"""
+        store = user.store
+        # Все известные категории получают коды заранее, чтобы сопоставление было одним map
+        code_by_name = {
+            cat.name: store.category_code(cat) for cat in self.data_manager.category_manager.all_categories
+        }
+        for alias, name in self.category_aliases.items():
+            if name in code_by_name:
+                code_by_name[alias] = code_by_name[name]
+        alive = store.alive
+        existing = np.sort(row_hashes(store.timestamps[alive], store.amounts[alive], store.category_codes[alive],
+                                      np.asarray(store.descriptions, dtype=object)[alive]))
+        
+        stats = {"read": 0, "imported": 0, "duplicates": 0, "skipped": 0}
+        parts = []
+        reader = pd.read_csv(
+            path, sep=self.sep, encoding=self.encoding, dtype=str, keep_default_na=False,
+            usecols=lambda name: name in self.columns.values(), chunksize=self.chunksize
+        )
+        for chunk in reader:
+            part = self._parse_chunk(chunk, code_by_name)
+            stats["read"] += len(chunk)
+            stats["skipped"] += len(chunk) - len(part[0])
+            # Исходный текст куска больше не нужен - дальше живут только колонки
+            del chunk
+            
+            hashes = row_hashes(*part)
+            # existing отсортирован, поэтому поиск - бинарный, без построения хэш-таблиц
+            positions = np.minimum(np.searchsorted(existing, hashes), max(len(existing) - 1, 0))
+            fresh = existing[positions] != hashes if len(existing) else np.ones(len(hashes), dtype=bool)
+            # Повторы внутри файла: остается первое вхождение
+            new_hashes, first = np.unique(hashes[fresh], return_index=True)
+            keep = np.flatnonzero(fresh)[np.sort(first)]
+            stats["duplicates"] += len(hashes) - len(keep)
+            if len(keep):
+                timestamps, amounts, codes, descriptions = part
+                parts.append((timestamps[keep], amounts[keep], codes[keep], descriptions[keep]))
+                stats["imported"] += len(keep)
+                # Следующие куски сверяются и с этим
+                existing = np.insert(existing, np.searchsorted(existing, new_hashes), new_hashes)
+        
+        if not parts:
+            return stats
+        
+        timestamps = np.concatenate([p[0] for p in parts])
+        amounts = np.concatenate([p[1] for p in parts])
+        codes = np.concatenate([p[2] for p in parts])
+        descriptions = np.concatenate([p[3] for p in parts]).tolist()
+        # Под замком отчеты не увидят строки, которых еще нет в хранилище
+        with user.lock:
+            ids = np.arange(store.next_id, store.next_id + len(amounts), dtype=np.int64)
+            # Сначала запись: при ошибке память остается как на диске.
+            # Весь пакет уходит в хранилище одной записью, строки кодируются потоком
+            if not self.data_manager.append_columns(user, ids, amounts, timestamps, codes, descriptions):
+                raise IOError("Не удалось сохранить импортированные транзакции")
+            user.extend_columns(amounts, timestamps, codes, descriptions, ids)
+        return stats
+    
+    def _parse_chunk(self, chunk: pd.DataFrame, code_by_name: dict):
+        columns = self.columns
+        names = chunk[columns["category"]].str.strip()
+        codes = names.map(code_by_name)
+        
+        amounts = chunk[columns["amount"]].str.replace(r"\s", "", regex=True)
+        if self.decimal != ".":
+            amounts = amounts.str.replace(self.decimal, ".", regex=False)
+        # В выписках расходы часто со знаком минус - тип задает категория, сумма всегда положительная
+        amounts = pd.to_numeric(amounts, errors="coerce").abs()
+        
+        dates = pd.to_datetime(chunk[columns["date"]], format=self.date_format,
+                               dayfirst=self.dayfirst, errors="coerce")
+        
+        if columns["description"] in chunk:
+            descriptions = chunk[columns["description"]]
+        else:
+            descriptions = pd.Series("", index=chunk.index)
+        
+        valid = (codes.notna() & amounts.gt(0) & dates.notna()).to_numpy(dtype=bool)
+        return (
+            dates.to_numpy(dtype="datetime64[us]")[valid].view(np.int64),
+            amounts.to_numpy(dtype=np.float64, na_value=np.nan)[valid],
+            codes.to_numpy(dtype=np.float64, na_value=np.nan)[valid].astype(np.int16),
+            descriptions.to_numpy(dtype=object)[valid]
+        )
\ No newline at end of file
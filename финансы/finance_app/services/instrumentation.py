@@ -0,0 +1,155 @@
+"""Замеры горячих мест: интервалы (spans) вокруг ввода-вывода, аналитики и отрисовки.
+
+Включение:
+    FINANCE_TRACE=1 python main.py          # сбор интервалов, сводка при выходе
+    FINANCE_TRACE=profile python main.py    # плюс cProfile главного потока
+    python main.py --trace / --profile      # то же флагами
+
+FINANCE_TRACE_FILE задает файл для сводки в JSON. Выключенный замер стоит
+одну проверку флага на вызов.
+"""
+import argparse
+import atexit
+import functools
+import json
+import math
+import os
+import sys
+import threading
+from time import perf_counter
+
+# Сколько строк cProfile печатать в сводке
+PROFILE_TOP = 25
+
+class _State:
+    enabled = False
+    profiler = None
+    output = None
+    configured = False
+
+_state = _State()
+_lock = threading.Lock()
+# Имя интервала -> длительности в секундах
+_samples = {}
+
+class _Span:
+    __slots__ = ("name", "start")
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        record(self.name, perf_counter() - self.start)
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def span(name: str):
+    """Контекстный менеджер: with span("reports.draw"): ..."""
+    return _Span(name) if _state.enabled else _NO_SPAN
+
+def timed(name: str = None):
+    """Декоратор: каждый вызов функции записывается интервалом name (по умолчанию - имя функции)"""
+    def decorate(func):
+        label = name or func.__qualname__
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(label, perf_counter() - start)
+        return wrapper
+    return decorate
+
+def record(name: str, seconds: float):
+    with _lock:
+        _samples.setdefault(name, []).append(seconds)
+
+def is_enabled() -> bool:
+    return _state.enabled
+
+def configure(enabled: bool = None, profile: bool = None, output: str = None):
+    """Включает замеры; None берет значение из FINANCE_TRACE / FINANCE_TRACE_FILE"""
+    mode = os.environ.get("FINANCE_TRACE", "").lower()
+    if profile is None:
+        profile = mode == "profile"
+    if enabled is None:
+        enabled = profile or mode not in ("", "0", "false", "no")
+    _state.enabled = enabled or profile
+    _state.output = output or os.environ.get("FINANCE_TRACE_FILE")
+    if profile and _state.profiler is None:
+        import cProfile
+        _state.profiler = cProfile.Profile()
+        _state.profiler.enable()
+    if _state.enabled and not _state.configured:
+        atexit.register(dump_summary)
+        _state.configured = True
+
+def configure_from_args(argv=None) -> list:
+    """Разбирает --trace и --profile; возвращает остальные аргументы"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--trace", action="store_true")
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--trace-file", default=None)
+    args, rest = parser.parse_known_args(argv)
+    configure(enabled=args.trace or None, profile=args.profile or None, output=args.trace_file)
+    return rest
+
+def summary() -> dict:
+    """{имя: {count, total, p50, p95, max}} в миллисекундах"""
+    with _lock:
+        samples = {name: sorted(values) for name, values in _samples.items()}
+    result = {}
+    for name, values in samples.items():
+        result[name] = {
+            "count": len(values),
+            "total_ms": sum(values) * 1000,
+            "p50_ms": _percentile(values, 50) * 1000,
+            "p95_ms": _percentile(values, 95) * 1000,
+            "max_ms": values[-1] * 1000
+        }
+    return result
+
+def reset():
+    with _lock:
+        _samples.clear()
+
+def dump_summary(stream=None):
+    """Печатает сводку интервалов (и профиль, если включен) - вызывается при выходе"""
+    stream = stream or sys.stderr
+    stats = summary()
+    if stats:
+        print(f"{'интервал':40} {'вызовов':>8} {'всего мс':>10} {'p50 мс':>9} {'p95 мс':>9} {'max мс':>9}", file=stream)
+        for name, s in sorted(stats.items(), key=lambda item: -item[1]["total_ms"]):
+            print(f"{name:40} {s['count']:>8} {s['total_ms']:>10.1f} {s['p50_ms']:>9.2f} "
+                  f"{s['p95_ms']:>9.2f} {s['max_ms']:>9.2f}", file=stream)
+    if _state.output:
+        with open(_state.output, "w", encoding="utf-8") as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+    if _state.profiler is not None:
+        import pstats
+        _state.profiler.disable()
+        pstats.Stats(_state.profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP)
+
+def _percentile(values: list, percent: float) -> float:
+    # Ближайший ранг по отсортированному списку
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+configure()
\ No newline at end of file
@@ -0,0 +1,45 @@
+"""Пул процессов для пакетной обработки хранилища (batch_reports, store_analytics).
+
+В каждом процессе один раз создается объект-обработчик, задачи вызывают его метод.
+В очереди пула не больше QUEUE_PER_WORKER задач на процесс: следующие берутся
+из итератора по мере готовности, поэтому в памяти родителя только окно задач.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Сколько задач на один процесс может ждать в очереди пула
+QUEUE_PER_WORKER = 2
+
+_worker = None
+
+def _init_worker(factory, args):
+    global _worker
+    _worker = factory(*args)
+
+def _call(method: str, args):
+    return getattr(_worker, method)(*args)
+
+def run_bounded(factory, init_args, method: str, tasks, on_result, on_error, workers: int = None):
+    """Выполняет задачи (ключ, аргументы) как factory(*init_args).method(*аргументы) в пуле.
+    on_result(ключ, результат) вызывается в этом процессе; ошибка задачи или on_result
+    передается в on_error(ключ, исключение)""" 
+    workers = workers or os.cpu_count() or 1
+    
+    def collect(futures):
+        for future in futures:
+            key = pending.pop(future)
+            try:
+                on_result(key, future.result())
+            except Exception as e:
+                on_error(key, e)
+    
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(factory, init_args)) as pool:
+        # future -> ключ задачи
+        pending = {}
+        for key, args in tasks:
+            if len(pending) >= workers * QUEUE_PER_WORKER:
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+            pending[pool.submit(_call, method, args)] = key
+            # Аргументы уже в очереди пула - здесь ссылка больше не нужна
+            del args
+        collect(wait(pending).done)
\ No newline at end of file
@@ -0,0 +1,94 @@
+import sys
+import threading
+import numpy as np
+from collections import OrderedDict
+
+# Ограничения кэша результатов аналитики по умолчанию
+MAX_ENTRIES = 128
+MAX_BYTES = 16 * 2**20
+
+def estimate_size(value) -> int:
+    """Примерный размер результата в байтах: pandas и numpy - по своим данным, контейнеры - рекурсивно"""
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(deep=True)
+        # У Series - число, у DataFrame - по колонкам
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+class ResultCache:
+    """LRU-кэш результатов для одной версии данных пользователя.
+    Ключ - (метод, аргументы); при смене версии кэш очищается целиком, так что
+    изменение транзакций само сбрасывает все результаты. Версии только растут:
+    запрос для более старой (расчет по снимку) считается без кэша и его не трогает.
+    Возвращаемые значения общие для всех вызывающих - изменять их нельзя"""
+    
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Ключ -> (размер, значение)
+        self._entries = OrderedDict()
+        self._version = None
+        self._bytes = 0
+        # Вызывается и из потока Tk, и из рабочего потока отчетов
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get_or_compute(self, version, key, compute):
+        with self._lock:
+            stale = self._version is not None and version < self._version
+            if not stale and version != self._version:
+                self._clear()
+                self._version = version
+            entry = None if stale else self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        
+        # Считаем без замка кэша - соседние ключи в это время доступны
+        value = compute()
+        size = estimate_size(value)
+        with self._lock:
+            if version == self._version and size <= self.max_bytes:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._bytes -= old[0]
+                self._entries[key] = (size, value)
+                self._bytes += size
+                while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                    evicted_size, _ = self._entries.popitem(last=False)[1]
+                    self._bytes -= evicted_size
+                    self.evictions += 1
+        return value
+    
+    def get(self, version, key, default=None):
+        """Готовый результат для этой версии без расчета и без учета в статистике"""
+        with self._lock:
+            entry = self._entries.get(key) if version == self._version else None
+            return default if entry is None else entry[1]
+    
+    def clear(self):
+        with self._lock:
+            self._clear()
+    
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "bytes": self._bytes
+        }
+    
+    def _clear(self):
+        self._entries.clear()
+        self._bytes = 0
\ No newline at end of file
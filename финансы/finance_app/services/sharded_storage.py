@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import sys
+from services.storage import StorageBackend, JsonStorage
+
+class ShardedJsonStorage(StorageBackend):
+    """Отдельный JSON-файл (с журналом) на каждого пользователя и небольшой индекс имен"""
+    
+    def __init__(self, data_dir: str = "finance_data"):
+        self.data_dir = data_dir
+        self.index_file = os.path.join(data_dir, "index.json")
+        self.users_dir = os.path.join(data_dir, "users")
+        os.makedirs(self.users_dir, exist_ok=True)
+        self._index = None
+        self._index_stamp = None
+        self._shards = {}
+    
+    def load_all(self):
+        return {username: self.load_user_data(username) for username in self._load_index()}
+    
+    def load_user_data(self, username):
+        if username not in self._load_index():
+            return None
+        return self._shard(username).load_user_data(username)
+    
+    def user_exists(self, username):
+        return username in self._load_index()
+    
+    def usernames(self):
+        return list(self._load_index())
+    
+    def save_user_data(self, user_data):
+        self._register(user_data["username"])
+        self._shard(user_data["username"]).save_user_data(user_data)
+    
+    def append_transactions(self, username, transactions):
+        self._register(username)
+        self._shard(username).append_transactions(username, transactions)
+    
+    def update_transaction(self, username, transaction):
+        self._shard(username).update_transaction(username, transaction)
+    
+    def delete_transaction(self, username, transaction_id):
+        self._shard(username).delete_transaction(username, transaction_id)
+    
+    def save_budgets(self, username, budgets):
+        self._shard(username).save_budgets(username, budgets)
+    
+    def compact(self):
+        for username in self._load_index():
+            self._shard(username).compact()
+    
+    def signature(self, username):
+        if username not in self._load_index():
+            return None
+        return self._shard(username).signature(username)
+    
+    def _shard(self, username):
+        if username not in self._shards:
+            self._shards[username] = JsonStorage(os.path.join(self.users_dir, self._load_index()[username]))
+        return self._shards[username]
+    
+    def _load_index(self):
+        """Индекс {имя: файл}; перечитывается только если файл изменился"""
+        try:
+            stat = os.stat(self.index_file)
+            stamp = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            stamp = None
+        if self._index is None or stamp != self._index_stamp:
+            if stamp is None:
+                self._index = {}
+            else:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            self._index_stamp = stamp
+        return self._index
+    
+    def _register(self, username):
+        index = self._load_index()
+        if username in index:
+            return
+        # Имя файла не зависит от символов в логине
+        index[username] = hashlib.sha1(username.encode('utf-8')).hexdigest()[:16] + ".json"
+        tmp_file = self.index_file + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.index_file)
+        stat = os.stat(self.index_file)
+        self._index_stamp = (stat.st_size, stat.st_mtime_ns)
+
+def migrate_json_to_shards(json_file: str = "finance_data.json", data_dir: str = "finance_data") -> int:
+    """Однократно раскладывает пользователей из общего JSON-файла по отдельным файлам"""
+    users_data = JsonStorage(json_file).load_all()
+    storage = ShardedJsonStorage(data_dir)
+    for user_data in users_data.values():
+        storage.save_user_data(user_data)
+    return len(users_data)
+
+if __name__ == "__main__":
+    # python -m services.sharded_storage [finance_data.json] [finance_data]
+    count = migrate_json_to_shards(*sys.argv[1:3])
+    print(f"Перенесено пользователей: {count}")
\ No newline at end of file
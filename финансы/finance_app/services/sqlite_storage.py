@@ -0,0 +1,242 @@
+import json
+import sqlite3
+import sys
+import threading
+from datetime import date
+from models.query import make_query
+from services.storage import StorageBackend, JsonStorage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL REFERENCES users(username),
+    date TEXT NOT NULL,
+    amount REAL NOT NULL,
+    category TEXT NOT NULL,
+    type TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    transaction_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions(username, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_category ON transactions(username, category);
+CREATE TABLE IF NOT EXISTS budgets (
+    username TEXT NOT NULL REFERENCES users(username),
+    category TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (username, category)
+);
+"""
+
+# id транзакции в приложении - transaction_id, он свой у каждого пользователя;
+# колонка id - служебный ключ строки таблицы
+TRANSACTION_COLUMNS = ("id", "amount", "category", "date", "description", "type")
+
+UPGRADE_TRANSACTION_IDS = """
+UPDATE transactions SET transaction_id = numbered.n
+FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY username ORDER BY id) AS n FROM transactions) AS numbered
+WHERE numbered.id = transactions.id
+"""
+
+# Выражение ключа группировки для SQLiteStorage.aggregate
+GROUP_EXPRESSIONS = {
+    "category": "category",
+    "type": "type",
+    "day": "substr(date, 1, 10)",
+    "month": "substr(date, 1, 7)"
+}
+
+def compile_query(query) -> tuple:
+    """Условия Query в SQL: (" AND ..." для WHERE, параметры).
+    Даты хранятся строками ISO, поэтому сравниваются как строки"""
+    clauses, params = [], []
+    if query.start is not None:
+        clauses.append("date >= ?")
+        params.append(query.start.isoformat())
+    if query.end is not None:
+        clauses.append("date < ?")
+        params.append(query.end.isoformat())
+    if query.categories is not None:
+        clauses.append(f"category IN ({', '.join('?' * len(query.categories))})")
+        params.extend(sorted(query.categories))
+    if query.type_ is not None:
+        clauses.append("type = ?")
+        params.append(query.type_)
+    if query.min_amount is not None:
+        clauses.append("amount >= ?")
+        params.append(query.min_amount)
+    if query.max_amount is not None:
+        clauses.append("amount <= ?")
+        params.append(query.max_amount)
+    if query.text:
+        # lower() в SQLite понимает только латиницу - регистр снимает Python
+        clauses.append("instr(py_lower(description), ?) > 0")
+        params.append(query.text)
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+class SQLiteStorage(StorageBackend):
+    """Хранилище в SQLite: каждая операция затрагивает только данные одного пользователя"""
+    supports_queries = True
+    
+    def __init__(self, db_file: str = "finance_data.db"):
+        self.db_file = db_file
+        # Соединение может использоваться из фонового потока, поэтому доступ к нему под блокировкой
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.create_function("py_lower", 1, lambda text: text.lower() if text else text, deterministic=True)
+        self._conn.executescript(SCHEMA)
+        self._upgrade()
+    
+    def load_all(self):
+        return {username: self.load_user_data(username) for username in self.usernames()}
+    
+    def usernames(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT username FROM users")]
+    
+    def load_user_data(self, username):
+        with self._lock:
+            if not self._user_exists(username):
+                return None
+            rows = self._conn.execute(
+                "SELECT transaction_id, amount, category, date, description, type FROM transactions "
+                "WHERE username = ? ORDER BY transaction_id", (username,)
+            ).fetchall()
+            budgets = self._conn.execute(
+                "SELECT category, data FROM budgets WHERE username = ?", (username,)
+            ).fetchall()
+        return {
+            "username": username,
+            "transactions": [dict(zip(TRANSACTION_COLUMNS, row)) for row in rows],
+            "budgets": {category: json.loads(data) for category, data in budgets}
+        }
+    
+    def user_exists(self, username):
+        with self._lock:
+            return self._user_exists(username)
+    
+    def save_user_data(self, user_data):
+        username = user_data["username"]
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO users(username) VALUES (?)", (username,))
+            self._conn.execute("DELETE FROM transactions WHERE username = ?", (username,))
+            self._conn.execute("DELETE FROM budgets WHERE username = ?", (username,))
+            self._insert_transactions(username, user_data.get("transactions", []))
+            self._conn.executemany(
+                "INSERT INTO budgets(username, category, data) VALUES (?, ?, ?)",
+                [(username, category, json.dumps(data, ensure_ascii=False))
+                 for category, data in user_data.get("budgets", {}).items()]
+            )
+    
+    def append_transactions(self, username, transactions):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO users(username) VALUES (?)", (username,))
+            self._insert_transactions(username, transactions)
+    
+    def update_transaction(self, username, transaction):
+        """Одна строка UPDATE по индексу (username, transaction_id)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE transactions SET amount = ?, category = ?, date = ?, description = ?, type = ? "
+                "WHERE username = ? AND transaction_id = ?",
+                (float(transaction["amount"]), transaction["category"], transaction["date"],
+                 transaction.get("description", ""), transaction["type"], username, transaction["id"])
+            )
+    
+    def delete_transaction(self, username, transaction_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM transactions WHERE username = ? AND transaction_id = ?", (username, transaction_id)
+            )
+    
+    def save_budgets(self, username, budgets):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM budgets WHERE username = ?", (username,))
+            self._conn.executemany(
+                "INSERT INTO budgets(username, category, data) VALUES (?, ?, ?)",
+                [(username, category, json.dumps(data, ensure_ascii=False)) for category, data in budgets.items()]
+            )
+    
+    def category_totals(self, username, type_, start=None, end=None):
+        """Фильтр по периоду и группировка выполняются в SQL по индексу (username, date)"""
+        totals = self.aggregate(username, make_query(start=start, end=end, type_=type_), "category")
+        return {category: total for category, (total, count) in totals.items()}
+    
+    def aggregate(self, username, query, by: str = "category") -> dict:
+        """То же, что User.aggregate, одним SQL-запросом: {ключ: (сумма, количество)}"""
+        if by not in GROUP_EXPRESSIONS:
+            raise ValueError(f"Неизвестный ключ группировки: {by}")
+        where, params = compile_query(query)
+        sql = (f"SELECT {GROUP_EXPRESSIONS[by]}, SUM(amount), COUNT(*) FROM transactions "
+               f"WHERE username = ?{where} GROUP BY 1")
+        with self._lock:
+            rows = self._conn.execute(sql, [username] + params).fetchall()
+        if by == "day":
+            return {date.fromisoformat(key): (total, count) for key, total, count in rows}
+        if by == "month":
+            return {date.fromisoformat(key + "-01"): (total, count) for key, total, count in rows}
+        return {key: (total, count) for key, total, count in rows}
+    
+    def signature(self, username):
+        """data_version меняется только после коммитов из других соединений"""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+    
+    def close(self):
+        self._conn.close()
+    
+    def _user_exists(self, username):
+        return self._conn.execute(
+            "SELECT 1 FROM users WHERE username = ?", (username,)
+        ).fetchone() is not None
+    
+    def _upgrade(self):
+        """Базы, созданные до появления id транзакций, получают колонку и нумерацию по порядку записи"""
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(transactions)")]
+        with self._conn:
+            if "transaction_id" not in columns:
+                self._conn.execute("ALTER TABLE transactions ADD COLUMN transaction_id INTEGER")
+                self._conn.execute(UPGRADE_TRANSACTION_IDS)
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions(username, transaction_id)"
+            )
+    
+    def _insert_transactions(self, username, transactions):
+        # Запись без id получает следующий номер пользователя
+        next_id = self._conn.execute(
+            "SELECT COALESCE(MAX(transaction_id), 0) + 1 FROM transactions WHERE username = ?", (username,)
+        ).fetchone()[0]
+        
+        def rows():
+            nonlocal next_id
+            for t in transactions:
+                transaction_id = t.get("id")
+                if transaction_id is None:
+                    transaction_id = next_id
+                next_id = max(next_id, transaction_id + 1)
+                yield (username, transaction_id, float(t["amount"]), t["category"], t["date"],
+                       t.get("description", ""), t["type"])
+        
+        self._conn.executemany(
+            "INSERT INTO transactions(username, transaction_id, amount, category, date, description, type) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows()
+        )
+
+def migrate_json_to_sqlite(json_file: str = "finance_data.json", db_file: str = "finance_data.db") -> int:
+    """Однократно переносит всех пользователей из JSON-файла (с журналом) в базу SQLite"""
+    users_data = JsonStorage(json_file).load_all()
+    storage = SQLiteStorage(db_file)
+    try:
+        for user_data in users_data.values():
+            storage.save_user_data(user_data)
+    finally:
+        storage.close()
+    return len(users_data)
+
+if __name__ == "__main__":
+    # python -m services.sqlite_storage [finance_data.json] [finance_data.db]
+    count = migrate_json_to_sqlite(*sys.argv[1:3])
+    print(f"Перенесено пользователей: {count}")
\ No newline at end of file
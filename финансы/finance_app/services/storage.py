@@ -0,0 +1,347 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from itertools import chain, islice
+from services.instrumentation import timed
+
+# После стольких записей журнал сворачивается в снимок finance_data.json
+COMPACT_EVERY = 1000
+
+def assign_missing_ids(transactions: list):
+    """Выдает id записям, сохраненным до появления id: по порядку, после максимального.
+    Правило детерминированное, поэтому ссылки журнала на такие записи не расходятся"""
+    next_id = 1
+    for t_data in transactions:
+        if t_data.get("id") is None:
+            t_data["id"] = next_id
+        next_id = max(next_id, t_data["id"] + 1)
+
+def apply_change(users_data: dict, entry: dict):
+    """Применяет к словарям пользователей одну запись журнала: add, edit, delete или budgets.
+    Списки транзакций упорядочены по id, поэтому строка ищется бинарным поиском.
+    Правка или удаление отсутствующей записи - KeyError: изменение не теряется молча"""
+    username = entry["user"]
+    user_data = users_data.setdefault(username, {"username": username, "transactions": [], "budgets": {}})
+    if entry["op"] == "budgets":
+        user_data["budgets"] = entry["budgets"]
+        return
+    transactions = user_data["transactions"]
+    if entry["op"] == "add":
+        t_data = entry["transaction"]
+        last_id = transactions[-1]["id"] if transactions else 0
+        if t_data.get("id") is None:
+            t_data["id"] = last_id + 1
+        if t_data["id"] > last_id:
+            transactions.append(t_data)
+        else:
+            # Отмена удаления: запись возвращается на свое место по id
+            transactions.insert(bisect_left(transactions, t_data["id"], key=lambda t: t["id"]), t_data)
+        return
+    transaction_id = entry["id"] if entry["op"] == "delete" else entry["transaction"]["id"]
+    i = bisect_left(transactions, transaction_id, key=lambda t: t["id"])
+    if i == len(transactions) or transactions[i]["id"] != transaction_id:
+        raise KeyError(f"Транзакция {transaction_id} не найдена у {username}")
+    if entry["op"] == "edit":
+        transactions[i] = entry["transaction"]
+    elif entry["op"] == "delete":
+        del transactions[i]
+
+def _ascending(transactions, last_id: int):
+    """Поток записей в конец списка. Запись с id не больше предыдущего прерывает запись снимка:
+    в конце списка она нарушила бы порядок по id, и ее правки потом терялись бы"""
+    for t_data in transactions:
+        if t_data.get("id") is not None:
+            if t_data["id"] <= last_id:
+                raise ValueError(f"id {t_data['id']} не по возрастанию - снимок не записан")
+            last_id = t_data["id"]
+        yield t_data
+
+class StorageBackend(ABC):
+    """Интерфейс хранилища: работает с «сырыми» словарями пользователей в формате finance_data.json.
+    Абстрактные методы обязательны - хранилище без них нельзя создать"""
+    # Умеет ли хранилище само фильтровать и агрегировать транзакции (например, через SQL)
+    supports_queries = False
+    # Все пользователи в одном файле: чтение любого из них разбирает файл целиком
+    single_file = False
+    
+    @abstractmethod
+    def load_all(self) -> dict:
+        ...
+    
+    @abstractmethod
+    def load_user_data(self, username):
+        ...
+    
+    @abstractmethod
+    def save_user_data(self, user_data: dict):
+        ...
+    
+    @abstractmethod
+    def append_transactions(self, username, transactions: list):
+        ...
+    
+    def update_transaction(self, username, transaction: dict):
+        """Заменяет транзакцию с тем же id (по умолчанию - перезаписью пользователя)"""
+        self._rewrite_user({"op": "edit", "user": username, "transaction": transaction})
+    
+    def delete_transaction(self, username, transaction_id: int):
+        self._rewrite_user({"op": "delete", "user": username, "id": transaction_id})
+    
+    def save_budgets(self, username, budgets: dict):
+        """Заменяет бюджеты пользователя, не трогая транзакции"""
+        self._rewrite_user({"op": "budgets", "user": username, "budgets": budgets})
+    
+    def _rewrite_user(self, entry):
+        users_data = {entry["user"]: self.load_user_data(entry["user"])}
+        if users_data[entry["user"]] is not None:
+            apply_change(users_data, entry)
+            self.save_user_data(users_data[entry["user"]])
+    
+    def user_exists(self, username) -> bool:
+        return self.load_user_data(username) is not None
+    
+    def usernames(self) -> list:
+        return list(self.load_all())
+    
+    def iter_user_data(self):
+        """Словари пользователей по одному; хранилища с раздельным доступом не держат всех в памяти"""
+        for username in self.usernames():
+            user_data = self.load_user_data(username)
+            if user_data is not None:
+                yield user_data
+    
+    def compact(self):
+        """Приводит хранилище в компактный вид (по умолчанию ничего не делает)"""
+    
+    def signature(self, username):
+        """Отпечаток данных пользователя, меняющийся при их изменении.
+        None означает, что хранилище не умеет его вычислять и кэшировать нельзя"""
+        return None
+    
+    def category_totals(self, username, type_: str, start=None, end=None) -> dict:
+        """Суммы по категориям за период [start, end) для транзакций типа type_"""
+        user_data = self.load_user_data(username) or {}
+        start = start.isoformat() if start else None
+        end = end.isoformat() if end else None
+        totals = {}
+        for t_data in user_data.get("transactions", []):
+            if t_data["type"] != type_:
+                continue
+            if (start and t_data["date"] < start) or (end and t_data["date"] >= end):
+                continue
+            totals[t_data["category"]] = totals.get(t_data["category"], 0) + float(t_data["amount"])
+        return totals
+
+class JsonStorage(StorageBackend):
+    """Один JSON-файл со всеми пользователями плюс журнал добавленных транзакций"""
+    single_file = True
+    
+    def __init__(self, data_file: str = "finance_data.json", use_journal: bool = True):
+        self.data_file = data_file
+        self.journal_file = data_file + ".journal"
+        self.use_journal = use_journal
+        self._journal_entries = None
+    
+    @timed("json_storage.load_all")
+    def load_all(self):
+        """Читает снимок и применяет к нему записи журнала"""
+        users_data = self._load_snapshot()
+        for user_data in users_data.values():
+            assign_missing_ids(user_data.get("transactions", []))
+        for entry in self._read_journal():
+            if entry.get("op") in ("add", "edit", "delete", "budgets"):
+                try:
+                    apply_change(users_data, entry)
+                except KeyError as e:
+                    # Остальной журнал применяется - одна битая запись не закрывает доступ к данным
+                    print(f"Ошибка: журнал {self.journal_file}: {e}")
+        return users_data
+    
+    def load_user_data(self, username):
+        return self.load_all().get(username)
+    
+    def user_exists(self, username):
+        return username in self.load_all()
+    
+    def iter_user_data(self):
+        """Файл общий, поэтому он разбирается один раз; отданные пользователи
+        сразу убираются из словаря, и память освобождается по ходу обхода"""
+        users_data = self.load_all()
+        while users_data:
+            yield users_data.pop(next(iter(users_data)))
+    
+    def save_user_data(self, user_data):
+        users_data = self.load_all()
+        users_data[user_data["username"]] = user_data
+        self._write_snapshot(users_data)
+    
+    def append_transactions(self, username, transactions):
+        """Дописывает транзакции в журнал одной записью на диск"""
+        if not self.use_journal:
+            self._write_snapshot(self.load_all(), (username, transactions))
+            return
+        
+        self._open_journal()
+        transactions = iter(transactions)
+        head = list(islice(transactions, COMPACT_EVERY - self._journal_entries))
+        if len(head) + self._journal_entries >= COMPACT_EVERY:
+            # Пакет все равно привел бы к сворачиванию - пишем его сразу в снимок,
+            # не прогоняя через журнал: начало пакета - на свои места по id, остаток - потоком
+            users_data = self.load_all()
+            for t_data in head:
+                apply_change(users_data, {"op": "add", "user": username, "transaction": t_data})
+            self._write_snapshot(users_data, (username, transactions))
+            return
+        
+        self._append_journal({"op": "add", "user": username, "transaction": t_data} for t_data in head)
+    
+    def update_transaction(self, username, transaction):
+        """Правка - одна строка журнала, а не перезапись снимка"""
+        self._change({"op": "edit", "user": username, "transaction": transaction})
+    
+    def delete_transaction(self, username, transaction_id):
+        self._change({"op": "delete", "user": username, "id": transaction_id})
+    
+    def save_budgets(self, username, budgets):
+        self._change({"op": "budgets", "user": username, "budgets": budgets})
+    
+    def _change(self, entry):
+        if not self.use_journal:
+            users_data = self.load_all()
+            apply_change(users_data, entry)
+            self._write_snapshot(users_data)
+            return
+        self._open_journal()
+        if self._journal_entries + 1 >= COMPACT_EVERY:
+            users_data = self.load_all()
+            apply_change(users_data, entry)
+            self._write_snapshot(users_data)
+            return
+        self._append_journal([entry])
+    
+    def _open_journal(self):
+        if self._journal_base() != self._snapshot_stamp():
+            # Журнала нет или он уже свернут в текущий снимок - начинаем новый
+            with open(self.journal_file, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({"op": "base", "snapshot": self._snapshot_stamp()}) + "\n")
+            self._journal_entries = 0
+        elif self._journal_entries is None:
+            self._journal_entries = len(self._read_journal())
+    
+    @timed("json_storage.append_journal")
+    def _append_journal(self, entries):
+        lines = [json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries]
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write("".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_entries += len(lines)
+    
+    def compact(self):
+        """Сворачивает журнал в снимок"""
+        self._write_snapshot(self.load_all())
+    
+    def signature(self, username):
+        """Размер и время изменения снимка и журнала"""
+        try:
+            stat = os.stat(self.journal_file)
+            journal_stamp = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            journal_stamp = None
+        return (self._snapshot_stamp(), journal_stamp)
+    
+    @timed("json_storage.parse_snapshot")
+    def _load_snapshot(self):
+        if not os.path.exists(self.data_file):
+            return {}
+        try:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return {}
+    
+    @timed("json_storage.write_snapshot")
+    def _write_snapshot(self, users_data, extra=None):
+        """Атомарно записывает снимок и сбрасывает журнал.
+        extra = (имя, транзакции) добавляются к списку этого пользователя: список - каждая
+        на свое место по id (в нем может быть отмена удаления), поток - в конец по возрастанию id"""
+        extra_user, extra_transactions = extra if extra else (None, ())
+        if extra_user is not None:
+            user_data = users_data.setdefault(extra_user, {"username": extra_user, "transactions": [], "budgets": {}})
+            if isinstance(extra_transactions, (list, tuple)):
+                for t_data in extra_transactions:
+                    apply_change(users_data, {"op": "add", "user": extra_user, "transaction": t_data})
+                extra_transactions = ()
+            else:
+                transactions = user_data.get("transactions", [])
+                extra_transactions = _ascending(extra_transactions, transactions[-1]["id"] if transactions else 0)
+        
+        tmp_file = self.data_file + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write("{")
+            for i, (username, user_data) in enumerate(users_data.items()):
+                transactions = user_data.get("transactions", [])
+                if username == extra_user:
+                    transactions = chain(transactions, extra_transactions)
+                # Остальные поля кодируются целиком, список транзакций - по одной записи,
+                # чтобы снимок не собирался в памяти одной большой строкой
+                fields = {key: value for key, value in user_data.items() if key != "transactions"}
+                header = json.dumps(dict(fields, transactions=[]), ensure_ascii=False)
+                f.write(("," if i else "") + "\n" + json.dumps(username, ensure_ascii=False) + ": ")
+                f.write(header[:-2])
+                for j, t_data in enumerate(transactions):
+                    f.write(("," if j else "") + "\n  " + json.dumps(t_data, ensure_ascii=False))
+                f.write("]}")
+            f.write("\n}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.data_file)
+        # Журнал привязан к прежнему снимку, так что после сбоя здесь он не применится повторно
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self._journal_entries = 0
+    
+    def _snapshot_stamp(self):
+        """Размер и время изменения снимка - к ним привязан журнал"""
+        try:
+            stat = os.stat(self.data_file)
+        except FileNotFoundError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+    
+    def _journal_base(self):
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+        except (FileNotFoundError, ValueError):
+            return False
+        return header.get("snapshot") if header.get("op") == "base" else False
+    
+    def _read_journal(self):
+        """Возвращает записи журнала, если он относится к текущему снимку"""
+        if self._journal_base() != self._snapshot_stamp():
+            return []
+        entries = []
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            next(f)
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Недописанная строка после сбоя - пропускаем
+                    continue
+        return entries
+
+def open_storage(kind: str = None) -> StorageBackend:
+    """Создает хранилище по имени; по умолчанию берется из переменной FINANCE_STORAGE"""
+    kind = kind or os.environ.get("FINANCE_STORAGE", "json")
+    if kind == "json":
+        return JsonStorage()
+    if kind == "sqlite":
+        from services.sqlite_storage import SQLiteStorage
+        return SQLiteStorage()
+    if kind == "sharded":
+        from services.sharded_storage import ShardedJsonStorage
+        return ShardedJsonStorage()
+    raise ValueError(f"Неизвестный тип хранилища: {kind}")
\ No newline at end of file
@@ -0,0 +1,249 @@
+"""Сводная аналитика по всем пользователям хранилища: расходы по категориям,
+распределение балансов и самые большие траты.
+
+Запуск из папки finance_app:
+    python -m services.store_analytics --backend sharded --workers 4 --chunk-size 64
+
+Map-reduce: пользователи раздаются пулу процессов (services.process_pool) пачками
+по chunk_size, каждый процесс сводит свою пачку в частичный итог, итоги сливаются
+по мере готовности. В очереди пула не больше QUEUE_PER_WORKER пачек на процесс.
+
+Хранилища с раздельным доступом (шарды, SQLite) процессы читают сами, им передаются
+только имена - память родителя ограничена окном пачек, а не числом пользователей.
+Общий JSON-файл так не умеет: снимок с журналом разбирается целиком в родительском
+процессе (JsonStorage.iter_user_data), и пулу уходят уже разобранные пользователи.
+Для JSON память растет с размером файла; окно пула ограничивает только копии в очереди.
+"""
+import argparse
+import heapq
+import json
+import sys
+import time
+from itertools import islice
+import numpy as np
+from models.category import CategoryManager
+from models.query import make_query
+from services.process_pool import run_bounded
+from services.storage import open_storage
+
+# Пользователей в одной задаче пула
+CHUNK_SIZE = 64
+# Длина списка самых больших трат и число столбцов гистограммы балансов
+TOP_SPENDERS = 10
+HISTOGRAM_BINS = 10
+
+class _Worker:
+    """Состояние процесса пула: свое подключение к хранилищу и справочник категорий"""
+    
+    def __init__(self, backend):
+        self.storage = open_storage(backend)
+        self.category_manager = CategoryManager()
+    
+    def summarize(self, chunk, top: int) -> dict:
+        """Частичный итог пачки: пользователи - словари хранилища или имена"""
+        partial = empty_partial()
+        for item in chunk:
+            username = item if isinstance(item, str) else item["username"]
+            try:
+                totals = self._user_totals(item)
+            except Exception as e:
+                print(f"Ошибка: {username}: {e}")
+                partial["failed"] += 1
+                continue
+            add_user(partial, username, totals, self.category_manager, top)
+        return partial
+    
+    def _user_totals(self, item) -> dict:
+        """Суммы пользователя по категориям: {имя категории: (сумма, количество)}"""
+        if isinstance(item, str) and self.storage.supports_queries:
+            # Группировка на стороне хранилища - строки пользователя не загружаются
+            return self.storage.aggregate(item, make_query(), "category")
+        user_data = self.storage.load_user_data(item) if isinstance(item, str) else item
+        sums, counts = {}, {}
+        for t_data in (user_data or {}).get("transactions", []):
+            name = t_data["category"]
+            sums[name] = sums.get(name, 0.0) + float(t_data["amount"])
+            counts[name] = counts.get(name, 0) + 1
+        return {name: (sums[name], counts[name]) for name in sums}
+
+def empty_partial() -> dict:
+    return {
+        "users": 0,
+        "failed": 0,
+        "transactions": 0,
+        "total_income": 0.0,
+        "total_expense": 0.0,
+        # Имя категории -> [сумма, количество]
+        "categories": {},
+        "balances": [],
+        # (расходы, имя) - не больше top самых больших
+        "top": []
+    }
+
+def add_user(partial: dict, username: str, totals: dict, category_manager, top: int):
+    """Учитывает суммы одного пользователя по категориям в частичном итоге.
+    Неизвестные категории пропускаются, как при загрузке пользователя"""
+    income = expense = 0.0
+    for name, (amount, count) in totals.items():
+        category = category_manager.get_category_by_name(name)
+        if not category:
+            continue
+        if category.type == "income":
+            income += amount
+        else:
+            expense += amount
+        cell = partial["categories"].get(name)
+        if cell is None:
+            cell = partial["categories"][name] = [0.0, 0]
+        cell[0] += amount
+        cell[1] += count
+        partial["transactions"] += count
+    partial["users"] += 1
+    partial["total_income"] += income
+    partial["total_expense"] += expense
+    partial["balances"].append(income - expense)
+    heapq.heappush(partial["top"], (expense, username))
+    if len(partial["top"]) > top:
+        heapq.heappop(partial["top"])
+
+def merge(result: dict, partial: dict, top: int):
+    """Шаг reduce: вливает частичный итог в общий"""
+    for key in ("users", "failed", "transactions", "total_income", "total_expense"):
+        result[key] += partial[key]
+    for name, (amount, count) in partial["categories"].items():
+        cell = result["categories"].get(name)
+        if cell is None:
+            cell = result["categories"][name] = [0.0, 0]
+        cell[0] += amount
+        cell[1] += count
+    result["balances"].extend(partial["balances"])
+    result["top"] = heapq.nlargest(top, result["top"] + partial["top"])
+    heapq.heapify(result["top"])
+
+def finish(result: dict) -> dict:
+    """Итоговый отчет из слитых частичных итогов"""
+    category_manager = CategoryManager()
+    spending, income = [], []
+    for name, (amount, count) in result["categories"].items():
+        category = category_manager.get_category_by_name(name)
+        row = {"category": name, "amount": amount, "count": count}
+        (income if category and category.type == "income" else spending).append(row)
+    spending.sort(key=lambda row: -row["amount"])
+    income.sort(key=lambda row: -row["amount"])
+    
+    balances = np.array(result["balances"], dtype=np.float64)
+    distribution = {}
+    if len(balances):
+        quantiles = np.quantile(balances, [0.1, 0.25, 0.5, 0.75, 0.9])
+        counts, edges = np.histogram(balances, bins=HISTOGRAM_BINS)
+        distribution = {
+            "mean": float(balances.mean()),
+            "min": float(balances.min()),
+            "p10": float(quantiles[0]),
+            "p25": float(quantiles[1]),
+            "median": float(quantiles[2]),
+            "p75": float(quantiles[3]),
+            "p90": float(quantiles[4]),
+            "max": float(balances.max()),
+            "negative": int(np.count_nonzero(balances < 0)),
+            "histogram": [
+                {"from": float(edges[i]), "to": float(edges[i + 1]), "users": int(counts[i])}
+                for i in range(len(counts))
+            ]
+        }
+    return {
+        "users": result["users"],
+        "failed": result["failed"],
+        "transactions": result["transactions"],
+        "total_income": result["total_income"],
+        "total_expense": result["total_expense"],
+        "spending_by_category": spending,
+        "income_by_category": income,
+        "balance_distribution": distribution,
+        "top_spenders": [
+            {"username": username, "expense": expense}
+            for expense, username in sorted(result["top"], reverse=True)
+        ]
+    }
+
+def _chunks(storage, chunk_size: int):
+    """Пачки для пула: разобранные пользователи общего файла или имена для раздельного чтения"""
+    if storage.single_file:
+        items = storage.iter_user_data()
+    else:
+        items = iter(storage.usernames())
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def analyze_store(backend: str = None, workers: int = None, chunk_size: int = CHUNK_SIZE,
+                  top: int = TOP_SPENDERS) -> dict:
+    """Сводка по всем пользователям хранилища (см. finish)"""
+    storage = open_storage(backend)
+    result = empty_partial()
+    
+    def on_error(size, e):
+        print(f"Ошибка: {e}")
+        result["failed"] += size
+    
+    # Ключ задачи - число пользователей в пачке
+    tasks = ((len(chunk), (chunk, top)) for chunk in _chunks(storage, chunk_size))
+    run_bounded(_Worker, (backend,), "summarize", tasks,
+                lambda size, partial: merge(result, partial, top), on_error, workers)
+    
+    close = getattr(storage, "close", None)
+    if close:
+        close()
+    return finish(result)
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"Пользователей: {report['users']} (с ошибками: {report['failed']}), "
+        f"транзакций: {report['transactions']}",
+        f"Доходы: {report['total_income']:.2f} руб., расходы: {report['total_expense']:.2f} руб.",
+        "",
+        "Расходы по категориям:"
+    ]
+    for row in report["spending_by_category"]:
+        lines.append(f"  {row['category']}: {row['amount']:.2f} руб. ({row['count']} шт.)")
+    distribution = report["balance_distribution"]
+    if distribution:
+        lines += [
+            "",
+            f"Балансы: медиана {distribution['median']:.2f}, среднее {distribution['mean']:.2f}, "
+            f"от {distribution['min']:.2f} до {distribution['max']:.2f} руб.",
+            f"  10% / 25% / 75% / 90%: {distribution['p10']:.2f} / {distribution['p25']:.2f} / "
+            f"{distribution['p75']:.2f} / {distribution['p90']:.2f}",
+            f"  С отрицательным балансом: {distribution['negative']}"
+        ]
+    lines += ["", "Самые большие траты:"]
+    for i, row in enumerate(report["top_spenders"], 1):
+        lines.append(f"  {i}. {row['username']}: {row['expense']:.2f} руб.")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сводная аналитика по всем пользователям хранилища")
+    parser.add_argument("--backend", default=None, choices=["json", "sqlite", "sharded"],
+                        help="по умолчанию из FINANCE_STORAGE")
+    parser.add_argument("--workers", type=int, default=None, help="процессов (по умолчанию по числу ядер)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="пользователей в одной задаче")
+    parser.add_argument("--top", type=int, default=TOP_SPENDERS, help="длина списка самых больших трат")
+    parser.add_argument("--output", default=None, help="сохранить сводку в JSON")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size должен быть положительным")
+    
+    start = time.perf_counter()
+    report = analyze_store(args.backend, args.workers, args.chunk_size, args.top)
+    seconds = time.perf_counter() - start
+    print(format_report(report))
+    print(f"\n{seconds:.1f} с ({report['users'] / seconds if seconds else 0:.1f} пользователей/с)")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if report["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
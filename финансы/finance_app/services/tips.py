@@ -0,0 +1,225 @@
+"""Правила советов по экономии.
+
+Каждое правило объявляет агрегаты, которые ему нужны. Движок сначала считает
+объединение этих агрегатов - каждый один раз и общим векторным проходом по окну
+истории, - затем вызывает правила, и правило только сравнивает готовые числа.
+Новое правило добавляется декоратором @rule и почти ничего не стоит.
+"""
+import numpy as np
+from time import perf_counter
+from models.budget import PERIOD_NAMES
+from models.rollup import DAY_US
+from services.instrumentation import span, record, is_enabled
+
+# Окно помесячных сумм: текущий месяц и столько полных месяцев перед ним
+FULL_MONTHS = 6
+MONTHS = FULL_MONTHS + 1
+# Всплеск: прошлый месяц больше среднего за три месяца до него во столько раз и на столько рублей
+SPIKE_RATIO = 1.5
+SPIKE_MIN = 1000.0
+# Регулярный платеж - одно описание в стольких месяцах из полных
+RECURRING_MONTHS = 3
+# Рост регулярных платежей за квартал, который считается заметным
+CREEP_RATIO = 1.1
+
+# Имя агрегата -> функция(контекст)
+AGGREGATES = {}
+# (имя правила, нужные агрегаты, функция(контекст) -> список советов) в порядке вывода
+RULES = []
+
+def aggregate(name: str):
+    def register(func):
+        AGGREGATES[name] = func
+        return func
+    return register
+
+def rule(*needs):
+    def register(func):
+        RULES.append((func.__name__, needs, func))
+        return func
+    return register
+
+class TipContext:
+    """Агрегаты для правил: считаются по требованию и не больше одного раза"""
+    
+    def __init__(self, analytics, now):
+        self.analytics = analytics
+        self.user = analytics.user
+        # Одно текущее время на весь расчет - окна всех агрегатов совпадают
+        self.now = now
+        # Имя агрегата -> значение или исключение, с которым он упал
+        self._values = {}
+        # Время расчета каждого агрегата: {имя: секунды}
+        self.timings = {}
+    
+    def __getitem__(self, name):
+        if name not in self._values:
+            start = perf_counter()
+            try:
+                with span(f"tips.aggregate.{name}"):
+                    self._values[name] = AGGREGATES[name](self)
+            except Exception as e:
+                self._values[name] = e
+            self.timings[name] = perf_counter() - start
+        value = self._values[name]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+def run_rules(analytics, now, rules=None):
+    """Советы всех правил на момент now и время расчета: (советы, {"aggregate.имя" | "rule.имя": секунды}).
+    Агрегат считается при первом правиле, которому он нужен; упавший агрегат
+    снимает только правила, которые от него зависят"""
+    rules = RULES if rules is None else rules
+    context = TipContext(analytics, now)
+    tips, timings = [], {}
+    for name, needs, func in rules:
+        try:
+            # Агрегаты до замера правила - время правила не включает общие расчеты
+            for need in needs:
+                context[need]
+            start = perf_counter()
+            tips.extend(func(context))
+            timings[f"rule.{name}"] = perf_counter() - start
+        except Exception as e:
+            print(f"Ошибка: {name}: {e}")
+            continue
+        if is_enabled():
+            record(f"tips.rule.{name}", timings[f"rule.{name}"])
+    timings.update((f"aggregate.{name}", seconds) for name, seconds in context.timings.items())
+    return tips, timings
+
+# Агрегаты
+
+@aggregate("summary")
+def _summary(context):
+    return context.user.get_financial_summary()
+
+@aggregate("budgets")
+def _budgets(context):
+    return context.user.budget_status(context.now)
+
+@aggregate("spending_month")
+def _spending_month(context):
+    return context.analytics.get_spending_by_category('month', now=context.now)
+
+@aggregate("income_dates")
+def _income_dates(context):
+    """Число доходов и их первая и последняя дата (мкс)"""
+    income = context.user.query(type_='income')
+    if not len(income):
+        return 0, None, None
+    timestamps = context.user.store.timestamps[income]
+    return len(income), int(timestamps.min()), int(timestamps.max())
+
+@aggregate("monthly")
+def _monthly(context):
+    """Суммы по (месяц, категория) за MONTHS месяцев одним bincount по строкам окна.
+    Позиции и номера месяцев строк отдаются дальше - на них считаются другие агрегаты"""
+    store = context.user.store
+    current = np.datetime64(context.now, "M")
+    start = (current - FULL_MONTHS).astype("datetime64[us]").item()
+    end = (current + 1).astype("datetime64[us]").item()
+    positions = context.user.query(start=start, end=end)
+    months = (store.timestamps[positions].view("datetime64[us]").astype("datetime64[M]")
+              - (current - FULL_MONTHS)).astype(np.int64)
+    width = len(store.categories)
+    sums = np.bincount(months * width + store.category_codes[positions], weights=store.amounts[positions],
+                       minlength=MONTHS * width).reshape(MONTHS, width)
+    income = np.array([cat.type == "income" for cat in store.categories], dtype=bool)
+    return {"positions": positions, "months": months, "sums": sums, "income": income}
+
+@aggregate("recurring")
+def _recurring(context):
+    """Регулярные расходы: описание встречается в RECURRING_MONTHS и более полных месяцах.
+    Возвращает описания и их суммы по полным месяцам (строки - описания)"""
+    store = context.user.store
+    monthly = context["monthly"]
+    positions, months = monthly["positions"], monthly["months"]
+    keep = ~store.is_income[positions] & (months < FULL_MONTHS)
+    positions, months = positions[keep], months[keep]
+    if not len(positions):
+        return np.array([], dtype=object), np.zeros((0, FULL_MONTHS))
+    # Описания уже закодированы хранилищем - группировка идет по целым числам
+    codes, inverse = np.unique(store.description_codes()[positions], return_inverse=True)
+    sums = np.bincount(inverse * FULL_MONTHS + months, weights=store.amounts[positions],
+                       minlength=len(codes) * FULL_MONTHS).reshape(len(codes), FULL_MONTHS)
+    names = np.array([store.description_names[code] for code in codes.tolist()], dtype=object)
+    regular = np.flatnonzero(((sums > 0).sum(axis=1) >= RECURRING_MONTHS) & (names != ""))
+    # По алфавиту, как раньше при группировке по строкам
+    regular = regular[np.argsort(names[regular])]
+    return names[regular], sums[regular]
+
+# Правила - в порядке вывода советов
+
+@rule("budgets")
+def budget_limits(context):
+    tips = []
+    for status in context["budgets"]:
+        if status['spent'] > status['limit']:
+            tips.append(f"🚨 Бюджет «{status['category']}» превышен: "
+                        f"{status['spent']:.2f} из {status['limit']:.2f} руб.")
+        elif status['overrun'] > 0:
+            tips.append(f"⚠️ «{status['category']}»: при текущем темпе за {PERIOD_NAMES[status['period']]} "
+                        f"выйдет {status['projected']:.2f} руб. при лимите {status['limit']:.2f}")
+    return tips
+
+@rule("summary")
+def negative_balance(context):
+    if context["summary"]['transaction_count'] and context["summary"]['balance'] < 0:
+        return ["🚨 Внимание! Ваши расходы превышают доходы. Срочно пересмотрите бюджет!"]
+    return []
+
+@rule("spending_month")
+def top_categories(context):
+    spending = context["spending_month"]
+    if spending.empty:
+        return []
+    return [f"💰 Самые большие расходы: {category} - {amount:.2f} руб."
+            for category, amount in spending.nlargest(2).items()]
+
+@rule("income_dates")
+def irregular_income(context):
+    count, first, last = context["income_dates"]
+    if count > 1 and (last - first) // DAY_US > 60 and count < 3:
+        return ["💡 Рекомендуем найти дополнительные источники дохода"]
+    return []
+
+@rule("monthly")
+def spending_spike(context):
+    """Категории, где прошлый месяц заметно дороже трех месяцев до него"""
+    monthly = context["monthly"]
+    sums = monthly["sums"][:, ~monthly["income"]]
+    names = [cat.name for cat in context.user.store.categories if cat.type != "income"]
+    last = sums[FULL_MONTHS - 1]
+    usual = sums[FULL_MONTHS - 4:FULL_MONTHS - 1].mean(axis=0)
+    spikes = np.flatnonzero((usual > 0) & (last > usual * SPIKE_RATIO) & (last - usual > SPIKE_MIN))
+    return [f"📈 {names[i]}: {last[i]:.2f} руб. в прошлом месяце - в {last[i] / usual[i]:.1f} раза больше обычного"
+            for i in spikes[np.argsort(-(last - usual)[spikes])][:2].tolist()]
+
+@rule("recurring")
+def subscription_creep(context):
+    """Регулярные платежи последнего квартала дороже предыдущего"""
+    names, sums = context["recurring"]
+    if not len(names):
+        return []
+    earlier = sums[:, :FULL_MONTHS // 2].sum() / (FULL_MONTHS // 2)
+    recent = sums[:, FULL_MONTHS // 2:].sum() / (FULL_MONTHS - FULL_MONTHS // 2)
+    if earlier > 0 and recent > earlier * CREEP_RATIO:
+        return [f"🔁 Регулярные платежи растут: {recent:.2f} руб. в месяц против {earlier:.2f} кварталом ранее "
+                f"({len(names)} шт.) - проверьте подписки"]
+    return []
+
+@rule("monthly")
+def savings_rate(context):
+    """Доля дохода, которая осталась за последние три полных месяца"""
+    monthly = context["monthly"]
+    quarter = monthly["sums"][FULL_MONTHS - 3:FULL_MONTHS]
+    income = float(quarter[:, monthly["income"]].sum())
+    expense = float(quarter[:, ~monthly["income"]].sum())
+    if income <= 0:
+        return []
+    rate = (income - expense) / income
+    if rate < 0.1:
+        return [f"💡 За три месяца вы отложили {max(rate, 0.0):.0%} дохода - старайтесь откладывать 10-20%"]
+    return []
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""Запрос к SQLite не отстает от очереди фоновой записи и считает целыми днями, как свертка"""
+from datetime import datetime
+from models.transaction import Transaction
+from models.user import User
+from services.analytics import AnalyticsService
+from services.background_saver import BackgroundSaver
+from services.data_manager import DataManager
+from services.sqlite_storage import SQLiteStorage
+
+def test_pushdown_matches_memory(tmp_path):
+    data_manager = DataManager(SQLiteStorage(str(tmp_path / "finance_data.db")))
+    category = data_manager.category_manager.expense_categories[0]
+    user = User("user")
+    data_manager.save_user(user)
+    saver = BackgroundSaver(data_manager, delay=0.05)
+    analytics = AnalyticsService(user, data_manager, saver)
+    now = datetime(2024, 3, 10, 15, 30)
+    try:
+        with user.lock:
+            transaction = Transaction(50.0, category, datetime(2024, 3, 9, 23, 0), "t")
+            user.add_transaction(transaction)
+            saver.append_transaction(user, transaction)
+            # Изменение еще в очереди - считается по памяти
+            assert not saver.is_saved(user)
+            assert analytics.aggregate("category") == {category.name: (50.0, 1)}
+        
+        # Отчет не ждет писателя; после записи очереди считает хранилище
+        assert saver.flush(timeout=5)
+        queries = []
+        category_totals = data_manager.storage.category_totals
+        data_manager.storage.category_totals = lambda *args: queries.append(args) or category_totals(*args)
+        report = analytics.compute_report("month", now=now)
+        assert report["spending"].to_dict() == {category.name: 50.0}
+        assert queries
+        
+        # Неполный день включается целиком в обоих путях
+        start, end = datetime(2024, 3, 9, 12), datetime(2024, 3, 9, 13)
+        assert analytics.get_spending_by_category(start_date=start, end_date=end).to_dict() == {category.name: 50.0}
+        assert AnalyticsService(user).get_spending_by_category(start_date=start, end_date=end).to_dict() == {category.name: 50.0}
+    finally:
+        saver.stop()
+        data_manager.storage.close()
\ No newline at end of file
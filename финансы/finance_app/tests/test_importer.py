@@ -0,0 +1,41 @@
+"""Импорт выписки: повторы внутри файла отбрасываются, неудачная запись не меняет память"""
+import pytest
+from models.user import User
+from services.data_manager import DataManager
+from services.importer import StatementImporter
+from services.storage import JsonStorage
+
+CSV = """date,amount,category,description
+2024-01-01 10:00,100.0,{cat},a
+2024-01-01 10:00,100.0,{cat},a
+2024-01-02 10:00,50.0,{cat},b
+2024-01-01 10:00,100.0,{cat},a
+2024-01-03 10:00,70.0,{cat},c
+"""
+
+@pytest.fixture
+def setup(tmp_path):
+    data_manager = DataManager(JsonStorage(str(tmp_path / "finance_data.json")))
+    user = User("user")
+    data_manager.save_user(user)
+    path = tmp_path / "statement.csv"
+    path.write_text(CSV.format(cat=data_manager.category_manager.expense_categories[0].name), encoding="utf-8")
+    return data_manager, user, str(path)
+
+def test_duplicates_inside_file_across_chunks(setup):
+    data_manager, user, path = setup
+    stats = StatementImporter(data_manager, chunksize=2).import_file(user, path)
+    assert (stats["imported"], stats["duplicates"]) == (3, 2)
+    assert [t.amount for t in user.transactions] == [100.0, 50.0, 70.0]
+    loaded = DataManager(JsonStorage(data_manager.storage.data_file)).load_user("user")
+    assert [(t.id, t.amount) for t in loaded.transactions] == [(t.id, t.amount) for t in user.transactions]
+
+def test_failed_save_keeps_memory_unchanged(setup, monkeypatch):
+    data_manager, user, path = setup
+    def fail(username, transactions):
+        raise OSError("диск недоступен")
+    monkeypatch.setattr(data_manager.storage, "append_transactions", fail)
+    with pytest.raises(IOError):
+        StatementImporter(data_manager).import_file(user, path)
+    assert len(user.store) == 0
+    assert user.totals.total_expense == 0
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""Отмена удаления, сворачивание журнала и правка той же записи переживают перезагрузку"""
+import json
+from datetime import datetime
+import pytest
+import services.storage as storage
+from models.transaction import Transaction
+from models.user import User
+from services.data_manager import DataManager
+from services.storage import JsonStorage, apply_change
+
+@pytest.fixture(params=["journal", "no_journal"])
+def data_manager(request, tmp_path, monkeypatch):
+    # Маленький порог - дозапись после отмены удаления сразу уходит в снимок
+    monkeypatch.setattr(storage, "COMPACT_EVERY", 7)
+    data_file = str(tmp_path / "finance_data.json")
+    return DataManager(JsonStorage(data_file, use_journal=request.param == "journal"))
+
+def reload(data_manager):
+    return DataManager(JsonStorage(data_manager.storage.data_file, data_manager.storage.use_journal))
+
+def test_delete_undo_compact_edit_reload(data_manager):
+    category = data_manager.category_manager.expense_categories[0]
+    user = User("user")
+    added = []
+    for day in range(1, 6):
+        transaction = Transaction(100.0 * day, category, datetime(2024, 1, day), f"t{day}")
+        user.add_transaction(transaction)
+        added.append(transaction)
+    assert data_manager.apply_changes(user, [("add", t) for t in added])
+    
+    target = added[1].id
+    user.delete_transaction(target)
+    assert data_manager.apply_changes(user, [("delete", target)])
+    restored = user.undo()
+    assert restored[0] == "add"
+    assert data_manager.apply_changes(user, [restored])
+    data_manager.compact()
+    
+    edited = user.edit_transaction(target, amount=999.0)
+    assert data_manager.apply_changes(user, [("edit", edited)])
+    
+    with open(data_manager.storage.data_file, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    ids = [t["id"] for t in snapshot["user"]["transactions"]]
+    assert ids == sorted(ids)
+    
+    loaded = reload(data_manager).load_user("user")
+    amounts = {t.id: t.amount for t in loaded.transactions}
+    assert amounts == {t.id: (999.0 if t.id == target else t.amount) for t in added}
+
+def test_edit_of_missing_transaction_raises():
+    users_data = {"user": {"username": "user", "transactions": [{"id": 1}, {"id": 3}], "budgets": {}}}
+    with pytest.raises(KeyError):
+        apply_change(users_data, {"op": "edit", "user": "user", "transaction": {"id": 2}})
+    with pytest.raises(KeyError):
+        apply_change(users_data, {"op": "delete", "user": "user", "id": 2})
\ No newline at end of file
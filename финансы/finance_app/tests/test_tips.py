@@ -0,0 +1,18 @@
+"""Движок советов: упавший агрегат снимает только зависящие от него правила"""
+from datetime import datetime
+from models.user import User
+from services.analytics import AnalyticsService
+from services import tips
+
+def test_failing_aggregate_drops_only_its_rules(monkeypatch):
+    def broken(context):
+        raise ValueError("сломан")
+    monkeypatch.setitem(tips.AGGREGATES, "broken", broken)
+    rules = [
+        ("uses_broken", ("broken",), lambda context: ["не должно попасть"]),
+        ("independent", ("summary",), lambda context: ["совет"])
+    ]
+    result, timings = tips.run_rules(AnalyticsService(User("user")), datetime(2024, 3, 10), rules)
+    assert result == ["совет"]
+    assert "rule.independent" in timings and "rule.uses_broken" not in timings
+    assert {"aggregate.summary", "aggregate.broken"} <= set(timings)
\ No newline at end of file
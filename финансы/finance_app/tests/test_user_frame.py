@@ -0,0 +1,37 @@
+"""Выданный DataFrame не меняется от последующих правок истории"""
+from datetime import datetime
+import pandas as pd
+from models.category import CategoryManager
+from models.transaction import Transaction
+from models.user import User
+
+def test_published_frame_survives_edit_delete_undo():
+    category_manager = CategoryManager()
+    expense = category_manager.expense_categories[0]
+    income = category_manager.income_categories[0]
+    user = User("user")
+    for day in range(1, 6):
+        user.add_transaction(Transaction(10.0 * day, expense, datetime(2024, 1, day), f"t{day}"))
+    ids = [t.id for t in user.transactions]
+    
+    # Правка только суммы не меняет типы колонок - кэш правится на месте
+    published = user.get_transactions_dataframe()
+    snapshot = published.copy(deep=True)
+    user.edit_transaction(ids[3], amount=40.5)
+    assert user.get_transactions_dataframe()["amount"].tolist()[3] == 40.5
+    pd.testing.assert_frame_equal(published, snapshot)
+    
+    published = user.get_transactions_dataframe()
+    snapshot = published.copy(deep=True)
+    user.edit_transaction(ids[0], amount=999.0, category=income)
+    user.delete_transaction(ids[1])
+    user.undo()
+    user.edit_transaction(ids[2], description="new")
+    pd.testing.assert_frame_equal(published, snapshot)
+    
+    frame = user.get_transactions_dataframe()
+    first = frame.loc[frame["description"] == "t1"].iloc[0]
+    assert first["amount"] == 999.0
+    assert first["signed_amount"] == 999.0
+    assert first["type"] == "income"
+    assert list(frame["description"]) == ["t1", "t2", "new", "t4", "t5"]
\ No newline at end of file
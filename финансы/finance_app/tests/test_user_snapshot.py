@@ -0,0 +1,30 @@
+"""Снимок пользователя для отчетов не меняется от правок истории"""
+from datetime import datetime
+from models.category import CategoryManager
+from models.transaction import Transaction
+from models.user import User
+from services.result_cache import ResultCache
+
+def test_snapshot_is_isolated_from_later_changes():
+    category = CategoryManager().expense_categories[0]
+    user = User("user")
+    for day in range(1, 4):
+        user.add_transaction(Transaction(10.0 * day, category, datetime(2024, 1, day), "t"))
+    snapshot = user.snapshot()
+    
+    first = user.transactions[0].id
+    user.edit_transaction(first, amount=999.0, description="new")
+    user.delete_transaction(user.transactions[1].id)
+    user.add_transaction(Transaction(5.0, category, datetime(2023, 12, 1), "old"))
+    
+    assert snapshot.version < user.version
+    assert [t.amount for t in snapshot.transactions] == [10.0, 20.0, 30.0]
+    assert snapshot.get_financial_summary()["total_expense"] == 60.0
+    assert sum(amount for amount, _ in snapshot.rollup.totals().values()) == 60.0
+    assert [snapshot.store.description_names[c] for c in snapshot.store.description_codes()] == ["t"] * 3
+
+def test_stale_version_does_not_reset_cache():
+    cache = ResultCache()
+    assert cache.get_or_compute(2, "key", lambda: "new") == "new"
+    assert cache.get_or_compute(1, "key", lambda: "old") == "old"
+    assert cache.get(2, "key") == "new"
\ No newline at end of file
@@ -0,0 +1,127 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from models.budget import PERIODS, PERIOD_NAMES
+from services.data_manager import get_data_manager
+from services.background_saver import get_background_saver
+
+COLUMNS = (
+    ("category", "Категория", 130),
+    ("period", "Период", 80),
+    ("limit", "Лимит", 100),
+    ("spent", "Потрачено", 100),
+    ("remaining", "Осталось", 100),
+    ("projected", "Прогноз", 100)
+)
+
+class BudgetFrame(ttk.Frame):
+    """Бюджеты по категориям: лимит, траты за текущий период и прогноз к его концу.
+    Цифры берутся из User.budget_status - без pandas и без прохода по истории"""
+    
+    def __init__(self, parent, user, on_changed=None):
+        super().__init__(parent)
+        self.user = user
+        self.on_changed = on_changed
+        self.category_manager = get_data_manager().category_manager
+        self.saver = get_background_saver()
+        self.stale = True
+        
+        self.create_widgets()
+        self.bind("<Map>", self.on_shown)
+    
+    def create_widgets(self):
+        # Форма бюджета
+        form_frame = ttk.Frame(self)
+        form_frame.pack(fill="x", padx=10, pady=5)
+        
+        ttk.Label(form_frame, text="Категория:").pack(side="left")
+        self.category_var = tk.StringVar()
+        categories = [cat.name for cat in self.category_manager.expense_categories]
+        category_combo = ttk.Combobox(form_frame, textvariable=self.category_var, values=categories,
+                                      state="readonly", width=14)
+        category_combo.pack(side="left", padx=5)
+        if categories:
+            category_combo.set(categories[0])
+        
+        ttk.Label(form_frame, text="Лимит:").pack(side="left")
+        self.limit_entry = ttk.Entry(form_frame, width=10)
+        self.limit_entry.pack(side="left", padx=5)
+        
+        ttk.Label(form_frame, text="Период:").pack(side="left")
+        self.period_var = tk.StringVar(value=PERIOD_NAMES["month"])
+        ttk.Combobox(form_frame, textvariable=self.period_var, values=[PERIOD_NAMES[p] for p in PERIODS],
+                     state="readonly", width=8).pack(side="left", padx=5)
+        
+        ttk.Button(form_frame, text="Сохранить бюджет", command=self.save_budget).pack(side="left", padx=5)
+        ttk.Button(form_frame, text="Удалить выбранный", command=self.delete_selected).pack(side="left")
+        
+        # Таблица состояния бюджетов
+        self.tree = ttk.Treeview(self, columns=[name for name, _, _ in COLUMNS], show="headings", selectmode="browse")
+        for name, title, width in COLUMNS:
+            self.tree.heading(name, text=title)
+            self.tree.column(name, width=width, anchor="w" if name in ("category", "period") else "e")
+        # Превышен уже и будет превышен при текущем темпе
+        self.tree.tag_configure("over", foreground="red")
+        self.tree.tag_configure("warn", foreground="#d35400")
+        self.tree.pack(fill="both", expand=True, padx=10, pady=5)
+        
+        self.limit_entry.bind('<Return>', lambda e: self.save_budget())
+    
+    def refresh(self):
+        """Перерисовывает таблицу; скрытая вкладка только помечается устаревшей"""
+        self.stale = True
+        if self.winfo_viewable():
+            self.render()
+    
+    def on_shown(self, event=None):
+        if self.stale:
+            self.render()
+    
+    def render(self):
+        self.stale = False
+        self.tree.delete(*self.tree.get_children())
+        for status in self.user.budget_status():
+            if status["spent"] > status["limit"]:
+                tags = ("over",)
+            elif status["overrun"] > 0:
+                tags = ("warn",)
+            else:
+                tags = ()
+            self.tree.insert("", "end", iid=status["category"], tags=tags, values=(
+                status["category"],
+                PERIOD_NAMES[status["period"]],
+                f"{status['limit']:.2f}",
+                f"{status['spent']:.2f}",
+                f"{status['remaining']:.2f}",
+                f"{status['projected']:.2f}"
+            ))
+    
+    def save_budget(self):
+        try:
+            limit = float(self.limit_entry.get())
+        except ValueError:
+            messagebox.showerror("Ошибка", "Введите корректный лимит")
+            return
+        if limit <= 0:
+            messagebox.showerror("Ошибка", "Лимит должен быть положительным")
+            return
+        period = next(p for p in PERIODS if PERIOD_NAMES[p] == self.period_var.get())
+        self.user.set_budget(self.category_var.get(), limit, period)
+        self.saver.save_budgets(self.user)
+        self.limit_entry.delete(0, tk.END)
+        self.changed()
+    
+    def delete_selected(self):
+        selection = self.tree.selection()
+        if not selection:
+            messagebox.showinfo("Бюджеты", "Выберите бюджет в таблице")
+            return
+        self.user.remove_budget(selection[0])
+        self.saver.save_budgets(self.user)
+        self.changed()
+    
+    def changed(self):
+        # Обработчик главного окна сам перерисует эту вкладку
+        if self.on_changed:
+            self.on_changed()
+        else:
+            self.render()
\ No newline at end of file
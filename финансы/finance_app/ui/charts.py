@@ -0,0 +1,207 @@
+import math
+from matplotlib.figure import Figure
+from matplotlib.dates import AutoDateLocator, DateFormatter, date2num
+from services.instrumentation import timed
+
+EXPENSE_COLORS = ['#e74c3c', '#e67e22', '#f39c12', '#d35400', '#c0392b', '#8e44ad']
+
+class ChartWidget:
+    """Долгоживущая фигура с холстом Tk: создается один раз, при обновлении
+    меняются только данные художников, а перерисовка идет через draw_idle.
+    Без parent график рисуется на холсте Agg без окна (бенчмарки, пакетные отчеты)"""
+    
+    def __init__(self, parent=None, figsize=(6, 4)):
+        # Figure без pyplot - не попадает в глобальный реестр фигур и не накапливается
+        self.figure = Figure(figsize=figsize)
+        self.ax = self.figure.add_subplot()
+        if parent is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.canvas = FigureCanvasAgg(self.figure)
+            self.widget = None
+        else:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            self.canvas = FigureCanvasTkAgg(self.figure, parent)
+            self.widget = self.canvas.get_tk_widget()
+        # Пакетные отчеты сохраняют фигуру в файл сами - отрисовка на холст им не нужна
+        self.auto_redraw = True
+        # Подпись для пустого графика, показывается вместо данных
+        self.empty_text = self.ax.text(0.5, 0.5, '', horizontalalignment='center',
+                                       verticalalignment='center', transform=self.ax.transAxes,
+                                       fontsize=12, visible=False)
+    
+    def pack(self, **kwargs):
+        self.widget.pack(**kwargs)
+    
+    @timed("chart.redraw")
+    def redraw(self):
+        if self.auto_redraw:
+            self.canvas.draw_idle()
+
+class SpendingPieChart(ChartWidget):
+    """Круговая диаграмма расходов по категориям"""
+    
+    def __init__(self, parent=None, figsize=(6, 4)):
+        super().__init__(parent, figsize)
+        self.labels = None
+        self.wedges = []
+        self.texts = []
+        self.autotexts = []
+    
+    def update(self, spending_data, period: str):
+        self.ax.set_title(f'Расходы по категориям ({period})')
+        
+        if spending_data.empty:
+            self._show_empty('Нет данных о расходах')
+            self.ax.set_title('Расходы по категориям')
+        elif list(spending_data.index) == self.labels:
+            # Те же категории - двигаем углы секторов и подписи на месте
+            self._set_angles(spending_data.values)
+        else:
+            self._build(spending_data)
+        self.redraw()
+    
+    def _show_empty(self, message: str):
+        for artist in self.wedges + self.texts + self.autotexts:
+            artist.set_visible(False)
+        self.empty_text.set_text(message)
+        self.empty_text.set_visible(True)
+        self.labels = None
+    
+    def _build(self, spending_data):
+        # Набор категорий изменился - пересоздаем только секторы, фигура и холст остаются
+        for artist in self.wedges + self.texts + self.autotexts:
+            artist.remove()
+        self.empty_text.set_visible(False)
+        self.wedges, self.texts, self.autotexts = self.ax.pie(
+            spending_data.values,
+            labels=spending_data.index,
+            autopct='%1.1f%%',
+            colors=EXPENSE_COLORS[:len(spending_data)]
+        )
+        self.labels = list(spending_data.index)
+    
+    def _set_angles(self, values):
+        total = float(sum(values))
+        theta = 0.0
+        for wedge, text, autotext, value in zip(self.wedges, self.texts, self.autotexts, values):
+            share = float(value) / total
+            theta1, theta2 = theta, theta + 360.0 * share
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+            wedge.set_visible(True)
+            # Подписи стоят на биссектрисе сектора, как их расставляет ax.pie
+            angle = math.radians((theta1 + theta2) / 2)
+            x, y = math.cos(angle), math.sin(angle)
+            text.set_position((1.1 * x, 1.1 * y))
+            text.set_horizontalalignment('left' if x > 0 else 'right')
+            text.set_visible(True)
+            autotext.set_position((0.6 * x, 0.6 * y))
+            autotext.set_text(f'{100.0 * share:1.1f}%')
+            autotext.set_visible(True)
+            theta = theta2
+
+class IncomeExpenseChart(ChartWidget):
+    """Столбчатая диаграмма доходов и расходов"""
+    
+    def __init__(self, parent=None, figsize=(6, 4)):
+        super().__init__(parent, figsize)
+        self.bars = self.ax.bar(['Доходы', 'Расходы'], [0, 0], color=['#2ecc71', '#e74c3c'], alpha=0.7)
+        self.value_texts = [
+            self.ax.text(bar.get_x() + bar.get_width()/2, 0, '', ha='center', va='bottom')
+            for bar in self.bars
+        ]
+        self.ax.set_title('Доходы vs Расходы')
+        self.ax.set_ylabel('Сумма (руб)')
+    
+    def update(self, data: dict):
+        values = [data['income'], data['expense']]
+        top = max(values)
+        for bar, text, value in zip(self.bars, self.value_texts, values):
+            bar.set_height(value)
+            # Добавляем подписи значений
+            text.set_position((bar.get_x() + bar.get_width()/2, value + top*0.01))
+            text.set_text(f'{value:.2f}')
+        # Масштаб оси пересчитывается по новым высотам столбцов
+        self.ax.set_ylim(0, top * 1.1 if top > 0 else 1)
+        self.redraw()
+
+class TrendChart(ChartWidget):
+    """Скользящие средние расходов в день: всего и по крупнейшим категориям,
+    с итогом прошлого месяца и прогнозом баланса на конец текущего"""
+    
+    # Сколько категорий показывать отдельными линиями
+    TOP_CATEGORIES = 3
+    
+    def __init__(self, parent=None, figsize=(8, 4)):
+        super().__init__(parent, figsize)
+        self.short_line, = self.ax.plot([], [], color='#e74c3c', linewidth=2)
+        self.long_line, = self.ax.plot([], [], color='#8e44ad', linewidth=2, linestyle='--')
+        self.category_lines = [
+            self.ax.plot([], [], color=color, linewidth=1, alpha=0.8)[0]
+            for color in EXPENSE_COLORS[1:1 + self.TOP_CATEGORIES]
+        ]
+        self.summary_text = self.ax.text(0.01, 0.98, '', transform=self.ax.transAxes,
+                                         verticalalignment='top', fontsize=9)
+        self.ax.xaxis.set_major_locator(AutoDateLocator())
+        self.ax.xaxis.set_major_formatter(DateFormatter('%m.%Y'))
+        self.ax.set_title('Тренды расходов')
+        self.ax.set_ylabel('Руб. в день')
+    
+    def update(self, trends: dict):
+        expense_short = trends["expense_short"]
+        lines = [self.short_line, self.long_line] + self.category_lines
+        if not expense_short.any():
+            for line in lines:
+                line.set_visible(False)
+            self.summary_text.set_visible(False)
+            legend = self.ax.get_legend()
+            if legend is not None:
+                legend.remove()
+            self.empty_text.set_text('Нет расходов за последний год')
+            self.empty_text.set_visible(True)
+            self.ax.set_axis_off()
+            self.redraw()
+            return
+        
+        self.empty_text.set_visible(False)
+        self.ax.set_axis_on()
+        x = date2num(expense_short.index.to_pydatetime())
+        self.short_line.set_data(x, expense_short.values)
+        self.short_line.set_label(f'Всего, среднее за {trends["short_window"]} дн.')
+        self.long_line.set_data(x, trends["expense_long"].values)
+        self.long_line.set_label(f'Всего, среднее за {trends["long_window"]} дн.')
+        # Крупнейшие категории - по длинному окну на сегодня
+        by_category = trends["by_category_short"]
+        top = trends["by_category_long"].iloc[-1].nlargest(self.TOP_CATEGORIES)
+        names = [name for name, value in top.items() if value > 0]
+        for i, line in enumerate(self.category_lines):
+            if i < len(names):
+                line.set_data(x, by_category[names[i]].values)
+                line.set_label(names[i])
+            else:
+                line.set_data([], [])
+                line.set_label('_hidden')
+        for line in lines:
+            line.set_visible(True)
+        self.ax.legend(loc='upper right', fontsize=8)
+        
+        self.summary_text.set_text(self._summary(trends))
+        self.summary_text.set_visible(True)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        # Запас сверху под подписи и легенду
+        top = max(expense_short.max(), trends["expense_long"].max())
+        self.ax.set_ylim(0, top * 1.4)
+        self.redraw()
+    
+    @staticmethod
+    def _summary(trends: dict) -> str:
+        monthly = trends["monthly"]
+        forecast = trends["forecast"]
+        lines = []
+        if len(monthly) > 1:
+            change = monthly["expense_change"].iloc[-2]
+            if math.isfinite(change):
+                lines.append(f'Расходы прошлого месяца: {monthly["expense"].iloc[-2]:.2f} руб. ({change:+.0%})')
+        lines.append(f'Баланс к концу месяца: {forecast["projected_balance"]:.2f} руб.')
+        return '\n'.join(lines)
\ No newline at end of file
@@ -0,0 +1,286 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import datetime, timedelta
+from services.history import HistoryView
+from services.data_manager import get_data_manager
+from services.background_saver import get_background_saver
+
+COLUMNS = (
+    ("date", "Дата", 130),
+    ("category", "Категория", 120),
+    ("type", "Тип", 70),
+    ("amount", "Сумма", 100),
+    ("description", "Описание", 300)
+)
+
+class HistoryFrame(ttk.Frame):
+    """История транзакций с виртуальной прокруткой: в Treeview всегда столько
+    строк, сколько помещается на экране, а их значения берутся из HistoryView"""
+    
+    def __init__(self, parent, user, on_changed=None):
+        super().__init__(parent)
+        self.user = user
+        self.on_changed = on_changed
+        self.category_manager = get_data_manager().category_manager
+        self.saver = get_background_saver()
+        self.view = HistoryView(user)
+        # Индекс первой видимой строки, виджеты-строки таблицы и позиции показанных в них транзакций
+        self.first = 0
+        self.items = []
+        self.shown = []
+        self.stale = True
+        
+        self.create_widgets()
+        self.bind("<Map>", self.on_shown)
+    
+    def create_widgets(self):
+        # Панель фильтров
+        filter_frame = ttk.Frame(self)
+        filter_frame.pack(fill="x", padx=10, pady=5)
+        
+        ttk.Label(filter_frame, text="Категория:").pack(side="left")
+        self.category_var = tk.StringVar(value="Все")
+        self.category_combo = ttk.Combobox(filter_frame, textvariable=self.category_var,
+                                           state="readonly", width=14)
+        self.category_combo.pack(side="left", padx=5)
+        
+        ttk.Label(filter_frame, text="С (ДД.ММ.ГГГГ):").pack(side="left")
+        self.start_entry = ttk.Entry(filter_frame, width=11)
+        self.start_entry.pack(side="left", padx=5)
+        
+        ttk.Label(filter_frame, text="По:").pack(side="left")
+        self.end_entry = ttk.Entry(filter_frame, width=11)
+        self.end_entry.pack(side="left", padx=5)
+        
+        ttk.Label(filter_frame, text="Сумма от:").pack(side="left")
+        self.min_entry = ttk.Entry(filter_frame, width=9)
+        self.min_entry.pack(side="left", padx=5)
+        
+        ttk.Label(filter_frame, text="до:").pack(side="left")
+        self.max_entry = ttk.Entry(filter_frame, width=9)
+        self.max_entry.pack(side="left", padx=5)
+        
+        ttk.Button(filter_frame, text="Применить", command=self.apply_filter).pack(side="left", padx=5)
+        
+        self.count_label = ttk.Label(filter_frame, text="")
+        self.count_label.pack(side="right")
+        
+        # Действия с выбранной транзакцией
+        action_frame = ttk.Frame(self)
+        action_frame.pack(fill="x", padx=10)
+        ttk.Button(action_frame, text="Изменить...", command=self.edit_selected).pack(side="left")
+        ttk.Button(action_frame, text="Удалить", command=self.delete_selected).pack(side="left", padx=5)
+        ttk.Button(action_frame, text="Отменить последнее", command=self.undo).pack(side="left")
+        
+        # Таблица и собственная полоса прокрутки: Treeview не знает о полном числе строк
+        table_frame = ttk.Frame(self)
+        table_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        
+        self.tree = ttk.Treeview(table_frame, columns=[name for name, _, _ in COLUMNS],
+                                 show="headings", selectmode="browse")
+        for name, title, width in COLUMNS:
+            self.tree.heading(name, text=title, command=lambda key=name: self.sort_by(key))
+            self.tree.column(name, width=width, anchor="e" if name == "amount" else "w")
+        self.scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.on_scrollbar)
+        
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        
+        self.tree.bind("<Configure>", lambda event: self.fit_rows())
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_to(self.first - 3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_to(self.first + 3))
+        self.tree.bind("<Up>", lambda event: self.scroll_to(self.first - 1))
+        self.tree.bind("<Down>", lambda event: self.scroll_to(self.first + 1))
+        self.tree.bind("<Prior>", lambda event: self.scroll_to(self.first - len(self.items)))
+        self.tree.bind("<Next>", lambda event: self.scroll_to(self.first + len(self.items)))
+    
+    def refresh(self):
+        """Перерисовывает видимое окно; скрытая вкладка только помечается устаревшей"""
+        self.stale = True
+        if self.winfo_viewable():
+            self.render()
+    
+    def on_shown(self, event=None):
+        if self.stale:
+            self.render()
+    
+    def fit_rows(self):
+        """Подгоняет число строк-виджетов под высоту таблицы"""
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # Строка заголовков занимает примерно одну строку
+        visible = max(1, self.tree.winfo_height() // row_height - 1)
+        while len(self.items) < visible:
+            self.items.append(self.tree.insert("", "end", values=()))
+        while len(self.items) > visible:
+            self.tree.delete(self.items.pop())
+        self.render()
+    
+    def render(self):
+        self.stale = False
+        names = ["Все"] + sorted({cat.name for cat in self.user.store.categories})
+        if list(self.category_combo["values"]) != names:
+            self.category_combo["values"] = names
+        
+        total = len(self.view)
+        self.first = max(0, min(self.first, total - len(self.items)))
+        rows = self.view.rows(self.first, self.first + len(self.items))
+        self.shown = [position for position, _ in rows]
+        for i, item in enumerate(self.items):
+            self.tree.item(item, values=rows[i][1] if i < len(rows) else ())
+        
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + len(self.items)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.count_label.config(text=f"Записей: {total}")
+    
+    def scroll_to(self, first: int):
+        self.first = first
+        self.render()
+        return "break"
+    
+    def on_scrollbar(self, action, value, unit=None):
+        total = len(self.view)
+        if action == "moveto":
+            self.scroll_to(int(float(value) * total))
+        elif action == "scroll":
+            step = len(self.items) if unit == "pages" else 1
+            self.scroll_to(self.first + int(value) * step)
+    
+    def on_mousewheel(self, event):
+        return self.scroll_to(self.first - 3 * (1 if event.delta > 0 else -1))
+    
+    def sort_by(self, key: str):
+        # Тип сортируется вместе с категорией
+        if key in ("type", "description"):
+            key = "category"
+        self.view.set_sort(key)
+        self.first = 0
+        self.render()
+    
+    def apply_filter(self):
+        try:
+            start = self._parse_date(self.start_entry.get())
+            end = self._parse_date(self.end_entry.get())
+            min_amount = float(self.min_entry.get()) if self.min_entry.get().strip() else None
+            max_amount = float(self.max_entry.get()) if self.max_entry.get().strip() else None
+        except ValueError:
+            messagebox.showerror("Ошибка", "Введите даты в формате ДД.ММ.ГГГГ и корректные суммы")
+            return
+        category = self.category_var.get()
+        self.view.set_filter(
+            category=None if category == "Все" else category,
+            start=start,
+            # Дата "по" включительно
+            end=end + timedelta(days=1) if end else None,
+            min_amount=min_amount,
+            max_amount=max_amount
+        )
+        self.first = 0
+        self.render()
+    
+    def selected_transaction(self):
+        """Транзакция в выбранной строке таблицы или None"""
+        selection = self.tree.selection()
+        if not selection or self.items.index(selection[0]) >= len(self.shown):
+            messagebox.showinfo("История", "Выберите транзакцию в таблице")
+            return None
+        return self.user.store[self.shown[self.items.index(selection[0])]]
+    
+    def edit_selected(self):
+        transaction = self.selected_transaction()
+        if transaction is not None:
+            EditTransactionDialog(self, transaction, self.category_manager, self.save_edit)
+    
+    def save_edit(self, transaction_id: int, amount: float, category, date, description: str):
+        # Правка и постановка в очередь под одним замком - отчеты не застанут базу отстающей
+        with self.user.lock:
+            edited = self.user.edit_transaction(transaction_id, amount, category, date, description)
+            self.saver.update_transaction(self.user, edited)
+        self.changed()
+    
+    def delete_selected(self):
+        transaction = self.selected_transaction()
+        if transaction is None:
+            return
+        if not messagebox.askyesno("Удаление", f"Удалить транзакцию {transaction.amount:.2f} руб. "
+                                               f"({transaction.category.name})?"):
+            return
+        with self.user.lock:
+            self.user.delete_transaction(transaction.id)
+            self.saver.delete_transaction(self.user, transaction.id)
+        self.changed()
+    
+    def undo(self):
+        with self.user.lock:
+            change = self.user.undo()
+            if change is not None:
+                self.saver.queue_change(self.user, change)
+        if change is None:
+            messagebox.showinfo("История", "Нечего отменять")
+            return
+        self.changed()
+    
+    def changed(self):
+        # Обработчик главного окна сам перерисует эту вкладку
+        if self.on_changed:
+            self.on_changed()
+        else:
+            self.render()
+    
+    @staticmethod
+    def _parse_date(text: str):
+        text = text.strip()
+        return datetime.strptime(text, "%d.%m.%Y") if text else None
+
+class EditTransactionDialog(tk.Toplevel):
+    """Окно правки одной транзакции"""
+    
+    def __init__(self, parent, transaction, category_manager, on_save):
+        super().__init__(parent)
+        self.title("Изменить транзакцию")
+        self.transaction = transaction
+        self.category_manager = category_manager
+        self.on_save = on_save
+        self.transient(parent)
+        
+        ttk.Label(self, text="Сумма:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.amount_entry = ttk.Entry(self, width=25)
+        self.amount_entry.insert(0, f"{transaction.amount:.2f}")
+        self.amount_entry.grid(row=0, column=1, padx=5, pady=5)
+        
+        ttk.Label(self, text="Категория:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        self.category_var = tk.StringVar(value=transaction.category.name)
+        ttk.Combobox(self, textvariable=self.category_var, state="readonly", width=23,
+                     values=[cat.name for cat in category_manager.all_categories]).grid(row=1, column=1, padx=5, pady=5)
+        
+        ttk.Label(self, text="Дата (ДД.ММ.ГГГГ ЧЧ:ММ):").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.date_entry = ttk.Entry(self, width=25)
+        self.date_entry.insert(0, transaction.date.strftime("%d.%m.%Y %H:%M"))
+        self.date_entry.grid(row=2, column=1, padx=5, pady=5)
+        
+        ttk.Label(self, text="Описание:").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        self.desc_entry = ttk.Entry(self, width=25)
+        self.desc_entry.insert(0, transaction.description)
+        self.desc_entry.grid(row=3, column=1, padx=5, pady=5)
+        
+        ttk.Button(self, text="Сохранить", command=self.save).grid(row=4, column=0, columnspan=2, pady=10)
+        self.grab_set()
+    
+    def save(self):
+        try:
+            amount = float(self.amount_entry.get())
+            date = datetime.strptime(self.date_entry.get().strip(), "%d.%m.%Y %H:%M")
+        except ValueError:
+            messagebox.showerror("Ошибка", "Введите корректную сумму и дату", parent=self)
+            return
+        if amount <= 0:
+            messagebox.showerror("Ошибка", "Сумма должна быть положительной", parent=self)
+            return
+        # Минуты в поле даты - если их не трогали, секунды исходной даты сохраняются
+        if date == self.transaction.date.replace(second=0, microsecond=0):
+            date = self.transaction.date
+        category = self.category_manager.get_category_by_name(self.category_var.get())
+        self.on_save(self.transaction.id, amount, category, date, self.desc_entry.get())
+        self.destroy()
\ No newline at end of file
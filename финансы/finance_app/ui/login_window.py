@@ -1,12 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from services.data_manager import DataManager
+from services.data_manager import get_data_manager
 
 class LoginWindow(tk.Frame):
     def __init__(self, parent, on_login_success):
         super().__init__(parent)
         self.on_login_success = on_login_success
-        self.data_manager = DataManager()
+        self.data_manager = get_data_manager()
         
         self.create_widgets()
     
@@ -1,7 +1,23 @@
+import importlib
+import threading
 import tkinter as tk
 from tkinter import ttk
 from ui.transaction_frame import TransactionFrame
-from ui.reports_frame import ReportsFrame
+from ui.history_frame import HistoryFrame
+from ui.budget_frame import BudgetFrame
+
+# Тяжелые модули отчетов (pandas, matplotlib), которые догружаются в фоне после входа
+REPORT_MODULES = ("ui.reports_frame",)
+
+def prefetch_modules(names=REPORT_MODULES):
+    """Импортирует модули в фоновом потоке, пока пользователь работает с первой вкладкой"""
+    def worker():
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                print(f"Ошибка: {e}")
+    threading.Thread(target=worker, name="prefetch", daemon=True).start()
 
 class MainWindow(tk.Frame):
     def __init__(self, parent, user, on_logout):
@@ -11,6 +27,7 @@ class MainWindow(tk.Frame):
         
         self.create_widgets()
         self.show_summary()
+        prefetch_modules()
     
     def create_widgets(self):
         # Верхняя панель с информацией о пользователе и балансом
@@ -38,9 +55,30 @@ class MainWindow(tk.Frame):
         self.transaction_tab = TransactionFrame(self.notebook, self.user, self.on_transaction_added)
         self.notebook.add(self.transaction_tab, text="Добавить транзакцию")
         
-        # Вкладка отчетов
+        # Вкладка истории
+        self.history_tab = HistoryFrame(self.notebook, self.user, self.on_transaction_added)
+        self.notebook.add(self.history_tab, text="История")
+        
+        # Вкладка бюджетов
+        self.budget_tab = BudgetFrame(self.notebook, self.user, self.on_transaction_added)
+        self.notebook.add(self.budget_tab, text="Бюджеты")
+        
+        # Вкладка отчетов создается при первом открытии, до этого на ее месте заглушка
+        self.reports_tab = None
+        self.reports_placeholder = ttk.Frame(self.notebook)
+        ttk.Label(self.reports_placeholder, text="Загрузка отчетов...").pack(pady=20)
+        self.notebook.add(self.reports_placeholder, text="Отчеты и аналитика")
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+    
+    def on_tab_changed(self, event=None):
+        if self.reports_tab is not None or self.notebook.select() != str(self.reports_placeholder):
+            return
+        # Обычно модуль уже загружен фоновым потоком и импорт мгновенный
+        from ui.reports_frame import ReportsFrame
         self.reports_tab = ReportsFrame(self.notebook, self.user)
-        self.notebook.add(self.reports_tab, text="Отчеты и аналитика")
+        self.notebook.insert(self.reports_placeholder, self.reports_tab, text="Отчеты и аналитика")
+        self.notebook.select(self.reports_tab)
+        self.notebook.forget(self.reports_placeholder)
     
     def show_summary(self):
         """Показывает текущий баланс"""
@@ -56,6 +94,9 @@ class MainWindow(tk.Frame):
     def on_transaction_added(self):
         """Обновляет интерфейс после добавления транзакции"""
         self.show_summary()
+        self.history_tab.refresh()
+        self.budget_tab.refresh()
         # Обновляем отчеты
-        if hasattr(self, 'reports_tab'):
-            self.reports_tab.update_reports()
\ No newline at end of file
+        if self.reports_tab is not None:
+            # Пересчет отложенный и в фоне: серия добавлений даст один пересчет
+            self.reports_tab.request_refresh()
\ No newline at end of file
@@ -1,15 +1,35 @@
 import tkinter as tk
 from tkinter import ttk
+from concurrent.futures import ThreadPoolExecutor
 from services.analytics import AnalyticsService
+from services.data_manager import get_data_manager
+from services.background_saver import get_background_saver
+from ui.charts import SpendingPieChart, IncomeExpenseChart, TrendChart
+from services.instrumentation import span, timed
+
+# Пауза перед пересчетом: несколько быстрых изменений сливаются в один пересчет
+REFRESH_DELAY_MS = 300
+POLL_INTERVAL_MS = 50
+
+# Один рабочий поток на все отчеты - пересчеты не конкурируют между собой
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reports")
 
 class ReportsFrame(ttk.Frame):
     def __init__(self, parent, user):
         super().__init__(parent)
         self.user = user
-        self.analytics = AnalyticsService(user)
+        self.analytics = AnalyticsService(user, get_data_manager(), get_background_saver())
+        # Данные устарели и будут пересчитаны, когда вкладку покажут
+        self.stale = True
+        self._refresh_job = None
+        self._poll_job = None
+        self._future = None
+        self._rerun = False
         
         self.create_widgets()
-        self.update_reports()
+        # Скрытая вкладка не пересчитывается: ждем, пока ее покажут
+        self.bind("<Map>", self.on_shown)
+        self.request_refresh()
     
     def create_widgets(self):
         # Вкладки для разных отчетов
@@ -20,12 +40,17 @@ class ReportsFrame(ttk.Frame):
         self.charts_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.charts_frame, text="Графики")
         
+        # Вкладка с трендами и прогнозом
+        self.trends_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.trends_frame, text="Тренды")
+        
         # Вкладка с советами
         self.tips_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.tips_frame, text="Советы по экономии")
         
         # Создаем содержимое вкладок
         self.create_charts_tab()
+        self.create_trends_tab()
         self.create_tips_tab()
     
     def create_charts_tab(self):
@@ -38,7 +63,7 @@ class ReportsFrame(ttk.Frame):
         period_combo = ttk.Combobox(control_frame, textvariable=self.period_var, 
                                    values=["week", "month", "all"], state="readonly")
         period_combo.pack(side="left", padx=5)
-        period_combo.bind('<<ComboboxSelected>>', self.update_reports)
+        period_combo.bind('<<ComboboxSelected>>', lambda event: self.request_refresh(delay=0))
         
         # Фрейм для графиков
         charts_container = ttk.Frame(self.charts_frame)
@@ -51,6 +76,16 @@ class ReportsFrame(ttk.Frame):
         # Правый график - доходы vs расходы
         self.right_chart_frame = ttk.Frame(charts_container)
         self.right_chart_frame.pack(side="right", fill="both", expand=True, padx=5)
+        
+        # Графики создаются один раз, дальше обновляются только их данные
+        self.pie_chart = SpendingPieChart(self.left_chart_frame)
+        self.pie_chart.pack(fill="both", expand=True)
+        self.bar_chart = IncomeExpenseChart(self.right_chart_frame)
+        self.bar_chart.pack(fill="both", expand=True)
+    
+    def create_trends_tab(self):
+        self.trend_chart = TrendChart(self.trends_frame)
+        self.trend_chart.pack(fill="both", expand=True, padx=10, pady=10)
     
     def create_tips_tab(self):
         # Текстовая область для советов
@@ -63,32 +98,71 @@ class ReportsFrame(ttk.Frame):
         
         # Кнопка обновления советов
         update_btn = ttk.Button(self.tips_frame, text="Обновить советы", 
-                               command=self.update_tips)
+                               command=lambda: self.request_refresh(delay=0))
         update_btn.pack(pady=5)
     
+    def request_refresh(self, delay: int = REFRESH_DELAY_MS):
+        """Планирует пересчет отчетов; повторные вызовы в пределах паузы сливаются в один"""
+        self.stale = True
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+        self._refresh_job = self.after(delay, self._start_refresh)
+    
     def update_reports(self, event=None):
-        # Очищаем предыдущие графики
-        for widget in self.left_chart_frame.winfo_children():
-            widget.destroy()
-        for widget in self.right_chart_frame.winfo_children():
-            widget.destroy()
-        
-        # Создаем новые графики
-        period = self.period_var.get()
-        pie_chart = self.analytics.create_pie_chart(self.left_chart_frame, period)
-        pie_chart.pack(fill="both", expand=True)
-        
-        bar_chart = self.analytics.create_income_expense_chart(self.right_chart_frame)
-        bar_chart.pack(fill="both", expand=True)
-        
-        # Обновляем советы
-        self.update_tips()
+        self.request_refresh(delay=0)
     
-    def update_tips(self):
-        tips = self.analytics.generate_economy_tips()
-        
+    def on_shown(self, event=None):
+        if self.stale:
+            self.request_refresh(delay=0)
+    
+    def _start_refresh(self):
+        self._refresh_job = None
+        if not self.winfo_viewable():
+            # Вкладка скрыта - остается помеченной устаревшей
+            return
+        if self._future is not None:
+            # Предыдущий пересчет еще идет - запустим еще один после него
+            self._rerun = True
+            return
+        self.stale = False
+        # Агрегация pandas идет в рабочем потоке, в потоке Tk остается только отрисовка
+        self._future = _executor.submit(self.analytics.compute_report, self.period_var.get())
+        self._poll_job = self.after(POLL_INTERVAL_MS, self._poll_refresh)
+    
+    def _poll_refresh(self):
+        if not self._future.done():
+            self._poll_job = self.after(POLL_INTERVAL_MS, self._poll_refresh)
+            return
+        future, self._future, self._poll_job = self._future, None, None
+        try:
+            self.show_report(future.result())
+        except Exception as e:
+            print(f"Ошибка: {e}")
+        if self._rerun:
+            self._rerun = False
+            self._start_refresh()
+    
+    @timed("reports.show_report")
+    def show_report(self, report: dict):
+        """Рисует готовые данные отчета; вызывается только из потока Tk"""
+        with span("reports.pie_chart"):
+            self.pie_chart.update(report["spending"], report["period"])
+        with span("reports.bar_chart"):
+            self.bar_chart.update(report["income_vs_expense"])
+        with span("reports.trend_chart"):
+            self.trend_chart.update(report["trends"])
+        self.show_tips(report["tips"])
+    
+    def show_tips(self, tips):
         self.tips_text.delete(1.0, tk.END)
         for tip in tips:
             self.tips_text.insert(tk.END, f"• {tip}\n\n")
         
-        self.tips_text.config(state="normal")
\ No newline at end of file
+        self.tips_text.config(state="normal")
+    
+    def destroy(self):
+        # Отменяем отложенные вызовы, чтобы они не сработали на удаленном виджете
+        for job in (self._refresh_job, self._poll_job):
+            if job is not None:
+                self.after_cancel(job)
+        super().destroy()
\ No newline at end of file
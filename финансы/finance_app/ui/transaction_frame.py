@@ -1,14 +1,16 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from models.transaction import Transaction
-from services.data_manager import DataManager
+from services.data_manager import get_data_manager
+from services.background_saver import get_background_saver
 
 class TransactionFrame(ttk.Frame):
     def __init__(self, parent, user, on_transaction_added):
         super().__init__(parent)
         self.user = user
         self.on_transaction_added = on_transaction_added
-        self.data_manager = DataManager()
+        self.data_manager = get_data_manager()
+        self.saver = get_background_saver()
         self.category_manager = self.data_manager.category_manager
         
         self.create_widgets()
@@ -53,6 +55,10 @@ class TransactionFrame(ttk.Frame):
         self.add_btn = ttk.Button(form_frame, text="Добавить транзакцию", command=self.add_transaction)
         self.add_btn.grid(row=4, column=1, padx=5, pady=10, sticky="e")
         
+        # Массовый импорт выписки
+        self.import_btn = ttk.Button(form_frame, text="Импорт выписки CSV...", command=self.import_statement)
+        self.import_btn.grid(row=5, column=1, padx=5, pady=5, sticky="e")
+        
         # Обновляем категории при старте
         self.update_categories()
         
@@ -87,8 +93,10 @@ class TransactionFrame(ttk.Frame):
             
             # Создаем транзакцию
             transaction = Transaction(amount, category, description=description)
-            self.user.add_transaction(transaction)
-            self.data_manager.save_user(self.user)
+            with self.user.lock:
+                self.user.add_transaction(transaction)
+                # Запись на диск идет в фоне, чтобы не подвешивать интерфейс
+                self.saver.append_transaction(self.user, transaction)
             
             # Очищаем поля
             self.amount_entry.delete(0, tk.END)
@@ -98,4 +106,28 @@ class TransactionFrame(ttk.Frame):
             self.on_transaction_added()
             
         except ValueError:
-            messagebox.showerror("Ошибка", "Введите корректную сумму")
\ No newline at end of file
+            messagebox.showerror("Ошибка", "Введите корректную сумму")
+    
+    def import_statement(self):
+        """Загружает выписку банка из CSV одним пакетом"""
+        path = filedialog.askopenfilename(
+            title="Выписка банка", filetypes=[("CSV", "*.csv"), ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+        
+        # Сначала дописываем очередь, чтобы импорт лег в хранилище после нее
+        self.saver.flush()
+        try:
+            # Импортер тянет pandas - загружаем его только при первом импорте
+            from services.importer import StatementImporter
+            stats = StatementImporter(self.data_manager).import_file(self.user, path)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось импортировать выписку: {e}")
+            return
+        
+        messagebox.showinfo("Импорт", f"Добавлено: {stats['imported']}\n"
+                                      f"Уже были в истории: {stats['duplicates']}\n"
+                                      f"Пропущено строк: {stats['skipped']}")
+        if stats["imported"]:
+            self.on_transaction_added()
\ No newline at end of file